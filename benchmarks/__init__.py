@@ -0,0 +1 @@
+# Benchmarks for the scheduling core. Run with: python -m benchmarks.run
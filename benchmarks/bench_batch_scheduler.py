@@ -0,0 +1,59 @@
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+# 📍 Make the scheduler modules in main/ importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main"))
+from batch_scheduler import SharedAvailability, assign_meetings
+
+TIMEZONES = ["UTC", "Asia/Kolkata", "Europe/London", "America/New_York", "Asia/Tokyo"]
+
+
+# 🎲 Build a random roster: each user is free for two blocks of a working day
+def make_roster(users, days, seed=42):
+    rng = random.Random(seed)
+    base = pytz.utc.localize(datetime(2025, 6, 30))
+    free_slots, timezones = {}, {}
+    for i in range(users):
+        slots = []
+        for day in range(days):
+            morning = base + timedelta(days=day, minutes=rng.randrange(6 * 60, 9 * 60, 15))
+            afternoon = morning + timedelta(minutes=rng.randrange(180, 300, 15))
+            slots.append({"start": morning, "end": morning + timedelta(minutes=rng.randrange(120, 180, 15))})
+            slots.append({"start": afternoon, "end": afternoon + timedelta(minutes=rng.randrange(120, 240, 15))})
+        free_slots[f"user{i}"] = slots
+        timezones[f"user{i}"] = rng.choice(TIMEZONES)
+    return free_slots, timezones
+
+
+# 🎲 Build random meetings of 2-8 attendees drawn from the roster
+def make_meetings(count, users, seed=7):
+    rng = random.Random(seed)
+    keys = [f"user{i}" for i in range(users)]
+    return [{
+        "attendees": rng.sample(keys, rng.randint(2, 8)),
+        "duration": rng.choice([30, 45, 60]),
+        "buffer": rng.choice([0, 5])
+    } for _ in range(count)]
+
+
+def run(meetings=100, users=200, days=10):
+    free_slots, timezones = make_roster(users, days)
+    specs = make_meetings(meetings, users)
+
+    started = time.perf_counter()
+    assignments = assign_meetings(SharedAvailability(free_slots, timezones), specs)
+    elapsed = time.perf_counter() - started
+
+    scheduled = sum(1 for slot in assignments if slot)
+    print(f"⏱️ {meetings} meetings x {users} people: {elapsed * 1000:.1f} ms, {scheduled} scheduled")
+    return elapsed
+
+
+# 🚀 Run this part only if the script is executed directly
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,60 @@
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+
+# 🌐 Default timezone mix for generated users
+DEFAULT_TIMEZONES = ["Asia/Kolkata", "UTC", "Europe/London", "America/New_York", "Asia/Tokyo"]
+
+
+def generate_calendar(users=50, slots_per_user=20, fragmentation=1, timezones=None,
+                      start_date="2025-06-30", days=5, seed=42):
+    """
+    Build a synthetic availability upload in the same format as
+    uploads/demo_calendar.json: {"user1": {name, email, timezone, slots}}.
+    Each user gets `slots_per_user` free blocks in local time, and each block
+    is split into `fragmentation` pieces with short gaps between them.
+    """
+    rng = random.Random(seed)
+    timezones = timezones or DEFAULT_TIMEZONES
+    base = datetime.strptime(start_date, "%Y-%m-%d")
+    blocks_per_day = max(1, slots_per_user // max(1, days))
+
+    calendar = {}
+    for i in range(1, users + 1):
+        slots = []
+        for block in range(slots_per_user):
+            day = base + timedelta(days=(block // blocks_per_day) % days)
+            start = day + timedelta(minutes=rng.randrange(8 * 60, 17 * 60, 15))
+            length = rng.randrange(60, 240, 15)
+            piece = max(15, length // fragmentation)
+            for _ in range(fragmentation):
+                end = start + timedelta(minutes=piece)
+                slots.append({"start": start.strftime("%Y-%m-%d %H:%M"), "end": end.strftime("%Y-%m-%d %H:%M")})
+                start = end + timedelta(minutes=rng.choice([0, 5, 15]))
+        calendar[f"user{i}"] = {
+            "name": f"User {i}",
+            "email": f"user{i}@example.com",
+            "timezone": rng.choice(timezones),
+            "slots": slots
+        }
+    return calendar
+
+
+# 🚀 Write a generated calendar to disk: python -m benchmarks.generator --users 1000 -o big.json
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Generate a synthetic availability JSON file.")
+    arg_parser.add_argument("--users", type=int, default=50)
+    arg_parser.add_argument("--slots", type=int, default=20, help="free blocks per user")
+    arg_parser.add_argument("--fragmentation", type=int, default=1, help="pieces each block is split into")
+    arg_parser.add_argument("--timezones", default=",".join(DEFAULT_TIMEZONES))
+    arg_parser.add_argument("--days", type=int, default=5)
+    arg_parser.add_argument("--seed", type=int, default=42)
+    arg_parser.add_argument("-o", "--output", default="synthetic_calendar.json")
+    args = arg_parser.parse_args()
+
+    data = generate_calendar(args.users, args.slots, args.fragmentation, args.timezones.split(","),
+                             days=args.days, seed=args.seed)
+    with open(args.output, "w") as f:
+        json.dump(data, f, indent=2)
+    print(f"✅ Wrote {args.users} users to {args.output}")
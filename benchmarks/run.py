@@ -0,0 +1,83 @@
+import argparse
+import inspect
+import json
+import os
+import sys
+import time
+
+from benchmarks import suites
+
+# 💾 Stored baseline timings (best-of-N seconds per benchmark)
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+
+def run_suites(repeat=7, name_filter=""):
+    """
+    Run every time_* method of every suite class and return the best-of-N
+    seconds per benchmark (the minimum is the least noisy on shared machines), keyed "Class.method".
+    """
+    results = {}
+    for class_name, suite_class in inspect.getmembers(suites, inspect.isclass):
+        if suite_class.__module__ != suites.__name__:
+            continue
+        methods = [name for name in dir(suite_class) if name.startswith("time_")]
+        methods = [name for name in methods if name_filter in f"{class_name}.{name}"]
+        if not methods:
+            continue
+
+        suite = suite_class()
+        for method in methods:
+            timings = []
+            # One untimed warm-up call fills lazy imports, like asv does
+            for attempt in range(repeat + 1):
+                # setup() runs before every call so each one starts from cold caches
+                suite.setup()
+                started = time.perf_counter()
+                getattr(suite, method)()
+                elapsed = time.perf_counter() - started
+                if attempt:
+                    timings.append(elapsed)
+            results[f"{class_name}.{method}"] = min(timings)
+    return results
+
+
+def compare(results, baselines, tolerance):
+    regressions = []
+    for name, seconds in sorted(results.items()):
+        baseline = baselines.get(name)
+        if baseline:
+            change = seconds / baseline - 1
+            flag = "❌ REGRESSION" if change > tolerance else "✅"
+            print(f"{flag} {name}: {seconds * 1000:.2f} ms (baseline {baseline * 1000:.2f} ms, {change:+.0%})")
+            if change > tolerance:
+                regressions.append(name)
+        else:
+            print(f"🆕 {name}: {seconds * 1000:.2f} ms (no baseline)")
+    return regressions
+
+
+# 🚀 python -m benchmarks.run [--save] [--filter CommonSlots] [--tolerance 0.25]
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Run the scheduling benchmarks.")
+    arg_parser.add_argument("--repeat", type=int, default=7)
+    arg_parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    arg_parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs. baseline")
+    arg_parser.add_argument("--save", action="store_true", help="store these results as the new baselines")
+    args = arg_parser.parse_args()
+
+    results = run_suites(args.repeat, args.filter)
+
+    baselines = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baselines = json.load(f)
+
+    regressions = compare(results, baselines, args.tolerance)
+
+    if args.save:
+        baselines.update(results)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"💾 Saved baselines to {BASELINE_PATH}")
+    elif regressions:
+        sys.exit(1)
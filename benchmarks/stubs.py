@@ -0,0 +1,138 @@
+import json
+import re
+import time
+from contextlib import contextmanager
+
+
+class StubGemini:
+    """
+    Stands in for the Gemini model: answers ranking prompts with "1" and
+    batched email prompts with a JSON array, after an optional delay.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        if "JSON array" in prompt:
+            ids = re.findall(r"- id (\d+): (.*)", prompt)
+            text = json.dumps([{"id": int(i), "email": f"Dear {name}, see you there."} for i, name in ids])
+        elif "slot number" in prompt:
+            text = "1"
+        else:
+            text = "Dear attendee, see you there."
+        return StubResponse(text)
+
+
+class StubResponse:
+    def __init__(self, text, status_code=200, payload=None):
+        self.text = text
+        self.status_code = status_code
+        self.headers = {}
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class StubZoomSession:
+    """
+    Stands in for zoom_meeting.session: issues tokens and creates meetings.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def post(self, url, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        if "oauth" in url:
+            return StubResponse("", 200, {"access_token": "stub-token", "expires_in": 3600})
+        return StubResponse("", 201, {"join_url": f"https://zoom.example/j/{self.calls}"})
+
+
+class StubGmailService:
+    """
+    Stands in for the Gmail API client. Messages are fully built (so MIME
+    construction is measured) but never leave the process.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.sent = 0
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def send(self, userId, body):
+        return StubGmailRequest(self, body)
+
+    def new_batch_http_request(self, callback):
+        return StubGmailBatch(self, callback)
+
+
+class StubGmailRequest:
+    def __init__(self, service, body):
+        self.service = service
+        self.body = body
+
+    def execute(self, http=None):
+        time.sleep(self.service.latency)
+        self.service.sent += 1
+        return {"id": f"stub-{self.service.sent}"}
+
+
+class StubGmailBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self, http=None):
+        time.sleep(self.service.latency)
+        for request_id, request in self.requests:
+            self.service.sent += 1
+            self.callback(request_id, {"id": f"stub-{self.service.sent}"}, None)
+
+
+@contextmanager
+def stub_backends(gemini_latency=0.0, zoom_latency=0.0, gmail_latency=0.0):
+    """
+    Swap Gemini, Zoom and Gmail for in-process stubs with configurable
+    latency, restoring the real clients afterwards.
+    """
+    import ai_utils
+    import send_email
+    import zoom_meeting
+
+    gemini = StubGemini(gemini_latency)
+    zoom = StubZoomSession(zoom_latency)
+    gmail = StubGmailService(gmail_latency)
+
+    originals = [
+        (ai_utils, "model", ai_utils.model),
+        (zoom_meeting, "session", zoom_meeting.session),
+        (send_email, "get_service", send_email.get_service),
+        (send_email, "get_http", send_email.get_http),
+    ]
+    ai_utils.model = gemini
+    zoom_meeting.session = zoom
+    zoom_meeting.token_manager.invalidate()
+    send_email.get_service = lambda: gmail
+    send_email.get_http = lambda: None
+    try:
+        yield {"gemini": gemini, "zoom": zoom, "gmail": gmail}
+    finally:
+        for module, name, value in originals:
+            setattr(module, name, value)
+        zoom_meeting.token_manager.invalidate()
@@ -0,0 +1,106 @@
+import io
+import json
+import os
+import sys
+from datetime import timedelta
+
+# 📍 Make the scheduler modules in main/ importable, with side-effect-free settings
+MAIN_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main")
+sys.path.insert(0, MAIN_DIR)
+os.environ.setdefault("JOB_STORE", "memory")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("EMAIL_RATE", "0")
+
+from benchmarks.generator import generate_calendar
+from benchmarks.stubs import stub_backends
+from benchmarks.bench_batch_scheduler import make_roster, make_meetings
+
+# Suites follow the asv layout: classes with setup() and time_* methods;
+# setup() is called before every timed call.
+
+
+class ParseSlots:
+    def setup(self):
+        from slot_parser import to_utc
+        # to_utc memoises conversions, so a warm cache would only time lookups
+        to_utc.cache_clear()
+        self.calendar = generate_calendar(users=200, slots_per_user=50, fragmentation=2)
+
+    def time_parse_slots(self):
+        from slot_parser import parse_slots
+        for user in self.calendar.values():
+            parse_slots(user["slots"], user["timezone"])
+
+
+class CommonSlots:
+    def setup(self):
+        from slot_parser import parse_slots
+        calendar = generate_calendar(users=50, slots_per_user=100, fragmentation=4, timezones=["UTC"])
+        self.users = [parse_slots(user["slots"], user["timezone"])[0] for user in calendar.values()]
+
+    def time_find_common_slots(self):
+        from slot_engine import intersect_slots
+        intersect_slots(self.users)
+
+    def time_find_common_windows_bitmap(self):
+        from availability_bitmap import find_common_windows
+        find_common_windows(self.users)
+
+    def time_availability_index(self):
+        from availability_index import AvailabilityIndex
+        index = AvailabilityIndex(min_length=timedelta(minutes=30))
+        for i, slots in enumerate(self.users):
+            index.add_user(i, slots)
+
+
+class Invites:
+    def setup(self):
+        from calendar_invite import generate_ics
+        self.ics_data = generate_ics("2025-06-30 10:00", "2025-06-30 10:30", "https://zoom.example/j/1")
+
+    def time_generate_ics(self):
+        from calendar_invite import generate_ics
+        generate_ics("2025-06-30 10:00", "2025-06-30 10:30", "https://zoom.example/j/1")
+
+    def time_build_message(self):
+        from send_email import build_message
+        build_message("user@example.com", "Meeting Confirmation", "Dear User,\n\nSee you there.", self.ics_data)
+
+
+class BatchScheduling:
+    def setup(self):
+        self.free_slots, self.timezones = make_roster(200, 10)
+        self.meetings = make_meetings(100, 200)
+
+    def time_assign_100_meetings_200_people(self):
+        from batch_scheduler import SharedAvailability, assign_meetings
+        assign_meetings(SharedAvailability(self.free_slots, self.timezones), self.meetings)
+
+
+class EndToEnd:
+    """
+    A full POST / with 50 attendees against stubbed Gemini, Zoom and Gmail.
+    """
+
+    def setup(self):
+        import app
+        import ai_utils
+        from slot_parser import to_utc
+        # Time a first request, not re-served conversions, rankings and email drafts
+        to_utc.cache_clear()
+        ai_utils.ranking_cache.clear()
+        ai_utils.draft_cache.clear()
+        calendar = generate_calendar(users=50, slots_per_user=10, timezones=["UTC"])
+        for user in calendar.values():
+            user["slots"].append({"start": "2025-06-30 07:00", "end": "2025-06-30 09:00"})
+        self.payload = json.dumps(calendar).encode()
+        self.client = app.app.test_client()
+
+    def time_schedule_request(self):
+        with stub_backends():
+            response = self.client.post('/', data={
+                'sender_name': 'Bench',
+                'confirm_choice': 'direct',
+                'calendar_file': (io.BytesIO(self.payload), 'calendar.json')
+            }, content_type='multipart/form-data')
+        assert response.status_code == 200
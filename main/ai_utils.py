@@ -1,20 +1,105 @@
 # Import necessary modules
 import os
-import google.generativeai as genai
+import re
+import json
+import logging
+import threading
+import time
 from dotenv import load_dotenv
+from rank_cache import RankingCache
+from draft_cache import DraftCache
+from slot_scoring import rank_slots_locally
+from metrics import record_external_error, register_cache
+from resilience import call_external, TransientError
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Set up Gemini API using the API key from .env
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+# Gemini model name
+GEMINI_MODEL = "models/gemini-1.5-pro-latest"
+
+# 💤 The Gemini client is built on first use: importing google.generativeai
+# takes about a second, which every gunicorn worker would otherwise pay at boot
+model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """
+    Return the shared Gemini model, configuring the SDK with the API key from
+    .env the first time it's needed.
+    """
+    global model
+    if model is None:
+        with _model_lock:
+            if model is None:
+                import google.generativeai as genai
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                model = genai.GenerativeModel(GEMINI_MODEL)
+    return model
+
+# Cache of slot rankings so re-submitting the same availability skips Gemini
+ranking_cache = RankingCache(
+    max_size=int(os.getenv("RANK_CACHE_SIZE", "256")),
+    ttl_seconds=int(os.getenv("RANK_CACHE_TTL", "3600")),
+    path=os.getenv("RANK_CACHE_PATH")
+)
+register_cache("rank", ranking_cache.stats)
+
+# Gemini-written confirmation emails, reused when the same person gets the same slot again
+draft_cache = DraftCache(
+    max_size=int(os.getenv("DRAFT_CACHE_SIZE", "1024")),
+    ttl_seconds=int(os.getenv("DRAFT_CACHE_TTL", "86400"))
+)
+
+# 🔗 Stands in for the meeting link when emails are written before the Zoom meeting exists
+LINK_PLACEHOLDER = "[MEETING_LINK]"
+
+# Only the locally best-scored slots are sent to Gemini for the final pick
+RANK_TOP_K = int(os.getenv("RANK_TOP_K", "5"))
+
+# Seconds to wait for Gemini's slot pick (0 skips Gemini and uses the local ranking)
+RANK_LATENCY_BUDGET = float(os.getenv("RANK_LATENCY_BUDGET", "10"))
+
+# Recipients per batched email prompt, so replies stay within Gemini's output limit
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "20"))
+
+# ⏳ Hard limit (seconds, retries included) and retries for each email-writing call
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "20"))
+GEMINI_RETRIES = int(os.getenv("GEMINI_RETRIES", "2"))
+
+
+# 🔁 Gemini errors worth another try: overload, rate limits, timeouts and dropped connections
+def gemini_retryable():
+    from google.api_core import exceptions
+    return (
+        exceptions.ServiceUnavailable, exceptions.ResourceExhausted, exceptions.InternalServerError,
+        exceptions.DeadlineExceeded, TransientError, OSError
+    )
+
+
+# 🛡️ Call Gemini under a deadline, with retries and the shared circuit breaker
+def call_gemini(operation, prompt, deadline=GEMINI_TIMEOUT, **kwargs):
+    return call_external(
+        "gemini", operation, get_model().generate_content, prompt,
+        deadline=deadline, retries=GEMINI_RETRIES, retry_on=gemini_retryable(),
+        request_options={"timeout": deadline}, **kwargs
+    )
 
-# Create a model object using the correct Gemini model name
-model = genai.GenerativeModel("models/gemini-1.5-pro-latest")
+
+# 🔗 Put the real meeting link into an email written against LINK_PLACEHOLDER
+def fill_meeting_link(body, meeting_link):
+    if LINK_PLACEHOLDER in body:
+        return body.replace(LINK_PLACEHOLDER, meeting_link)
+    if meeting_link in body:
+        return body
+    return f"{body}\n\n🔗 Meeting Link: {meeting_link}"
 
 
 # Function to generate a confirmation email for a meeting
-def generate_ai_message(name, slot, meeting_link):
+def generate_ai_message(name, slot, meeting_link, deadline=GEMINI_TIMEOUT):
     date = slot['start'].split()[0]
     start_time = slot['start'].split()[1]
     end_time = slot['end'].split()[1]
@@ -30,30 +115,51 @@ Make it polite, professional, and natural. Avoid mentioning that it is AI-genera
 """
 
     try:
-        print(f"🧠 Gemini called: Generating confirmation email for {name}...")
-        response = model.generate_content(prompt)
-        print("✅ Gemini email generation complete.")
+        logger.info("🧠 Gemini called: Generating confirmation email", extra={"recipient": name})
+        response = call_gemini("confirmation", prompt, deadline=deadline)
+        logger.info("✅ Gemini email generation complete.")
         return response.text.strip()
     except Exception as e:
-        print("❌ AI generation failed:", e)
+        logger.warning("❌ AI generation failed: %s", e)
         return None
 
 
 # Function to choose the best time slot from a list using Gemini AI
-def rank_slots_with_gpt(slots):
+def rank_slots_with_gpt(slots, timezones=None, top_k=RANK_TOP_K, latency_budget=RANK_LATENCY_BUDGET):
+    """
+    Return the slots best-first. A local scorer orders every slot by attendee
+    working hours and start-time alignment, then Gemini picks among the top_k.
+    Gemini is skipped when only one candidate is left or the latency budget
+    is 0, and any Gemini failure falls back to the local order.
+    """
     if not slots:
-        print("⚠️ No slots to rank.")
+        logger.warning("⚠️ No slots to rank.")
         return []
 
+    timezones = timezones or []
+    cached = ranking_cache.get(slots, timezones)
+    if cached:
+        logger.info("⚡ Slot ranking served from cache.")
+        return list(cached)
+
+    ranked = rank_slots_locally(slots, timezones)
+    candidates = ranked[:top_k]
+    if len(candidates) == 1 or latency_budget <= 0:
+        logger.info("⚡ Slot ranking done locally.", extra={"candidates": len(ranked)})
+        return ranked
+
     slot_text = "\n".join(
-        f"{i+1}. {slot['start']} to {slot['end']} UTC" for i, slot in enumerate(slots)
+        f"{i+1}. {slot['start']} to {slot['end']} UTC" for i, slot in enumerate(candidates)
     )
+    zone_text = ", ".join(sorted(set(timezones))) or "UTC"
 
     prompt = f"""
 You are an intelligent scheduling assistant. Here are some available meeting slots:
 
 {slot_text}
 
+Attendees are in these time zones: {zone_text}
+
 Choose the best slot based on:
 - Natural working hours
 - Balance for global time zones
@@ -63,21 +169,27 @@ Respond with only the slot number (e.g., 1, 2, etc.) of the best slot.
 """
 
     try:
-        print("🧠 Gemini called: Ranking slots...")
-        response = model.generate_content(prompt)
-        content = response.text.strip()
-        slot_number = int("".join(filter(str.isdigit, content)))
-        print("✅ Gemini selected slot:", slot_number)
-        return [slots[slot_number - 1]]
+        logger.info("🧠 Gemini called: Ranking slots...", extra={"candidates": len(candidates)})
+        response = call_gemini("rank", prompt, deadline=latency_budget)
+        match = re.search(r"\d+", response.text)
+        slot_number = int(match.group()) if match else 0
+        if not 1 <= slot_number <= len(candidates):
+            record_external_error("gemini", "rank", "bad_reply")
+            raise ValueError(f"unexpected reply {response.text.strip()!r}")
+        logger.info("✅ Gemini selected slot", extra={"slot_number": slot_number})
+        best_slot = candidates[slot_number - 1]
+        ranking = [best_slot] + [slot for slot in ranked if slot is not best_slot]
+        ranking_cache.put(slots, ranking, timezones)
+        return list(ranking)
     except Exception as e:
-        print("❌ Slot ranking failed:", e)
-        return slots
+        logger.warning("❌ Slot ranking failed, using local ranking: %s", e)
+        return ranked
 
 
 # Function to create a reschedule email if no common slot is found
 def generate_reschedule_message(name, sender, fallback_slots):
     if not fallback_slots:
-        print("⚠️ No fallback slots provided for reschedule message.")
+        logger.warning("⚠️ No fallback slots provided for reschedule message.")
         return None
 
     slot_text = "\n".join(
@@ -96,10 +208,121 @@ End the email kindly and professionally, signed by {sender}. Avoid mentioning th
 """
 
     try:
-        print(f"🧠 Gemini called: Generating reschedule email for {name}...")
-        response = model.generate_content(prompt)
-        print("✅ Reschedule email generation complete.")
+        logger.info("🧠 Gemini called: Generating reschedule email", extra={"recipient": name})
+        response = call_gemini("reschedule", prompt)
+        logger.info("✅ Reschedule email generation complete.")
         return response.text.strip()
     except Exception as e:
-        print("❌ AI reschedule message generation failed:", e)
+        logger.warning("❌ AI reschedule message generation failed: %s", e)
         return None
+
+
+# Pull the per-recipient emails out of a batched JSON reply
+def parse_batch_reply(text, count):
+    text = text.strip()
+    start, end = text.find("["), text.rfind("]")
+    if start == -1 or end < start:
+        return [None] * count
+    try:
+        entries = json.loads(text[start:end + 1])
+    except ValueError:
+        return [None] * count
+
+    emails = [None] * count
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        index, body = entry.get("id"), entry.get("email")
+        if isinstance(index, int) and 0 <= index < count and isinstance(body, str) and body.strip():
+            emails[index] = body.strip()
+    return emails
+
+
+# Run one Gemini prompt per chunk of recipients and collect their emails in order
+def generate_batch(names, build_prompt, label, deadline=GEMINI_TIMEOUT):
+    emails = []
+    expires_at = time.monotonic() + deadline
+    for offset in range(0, len(names), EMAIL_BATCH_SIZE):
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0:
+            # ⏳ Out of time: the recipients left over get the template email
+            logger.warning("⏳ AI batch %s generation ran out of time", label, extra={"missing": len(names) - offset})
+            return emails + [None] * (len(names) - offset)
+        chunk = names[offset:offset + EMAIL_BATCH_SIZE]
+        recipients = "\n".join(f'- id {i}: {name}' for i, name in enumerate(chunk))
+        prompt = build_prompt(recipients) + """
+Respond with only a JSON array containing one object per recipient, in the form
+[{"id": <recipient id>, "email": "<full email text>"}]
+"""
+        try:
+            logger.info("🧠 Gemini called: Generating emails in one batch", extra={"kind": label, "recipients": len(chunk)})
+            response = call_gemini(
+                f"{label}_batch",
+                prompt,
+                deadline=remaining,
+                generation_config={"response_mime_type": "application/json"}
+            )
+            parsed = parse_batch_reply(response.text, len(chunk))
+            parsed_count = sum(1 for e in parsed if e)
+            if parsed_count < len(chunk):
+                record_external_error("gemini", f"{label}_batch", "bad_reply")
+            logger.info("✅ Gemini batch complete", extra={"kind": label, "parsed": parsed_count, "recipients": len(chunk)})
+        except Exception as e:
+            logger.warning("❌ AI batch %s generation failed: %s", label, e)
+            return None
+        emails.extend(parsed)
+    return emails
+
+
+# Function to generate confirmation emails for many recipients with one prompt
+def generate_ai_messages(names, slot, meeting_link, deadline=GEMINI_TIMEOUT):
+    """
+    Return one email per name (None where the reply could not be parsed), or
+    None if the Gemini call itself failed. Pass LINK_PLACEHOLDER as the link
+    to write the emails before the meeting exists.
+    """
+    date = slot['start'].split()[0]
+    start_time = slot['start'].split()[1]
+    end_time = slot['end'].split()[1]
+
+    def build_prompt(recipients):
+        return f"""
+Generate a short, friendly email for a meeting confirmation for each of these recipients:
+{recipients}
+
+Meeting details:
+- Date: {date}
+- Time: {start_time} to {end_time} UTC
+- Meeting link: {meeting_link}
+
+Address each email to its recipient by name and copy the meeting link exactly as written. Make it polite, professional, and natural. Avoid mentioning that it is AI-generated. End with a positive note.
+"""
+
+    return generate_batch(names, build_prompt, "confirmation", deadline)
+
+
+# Function to create reschedule emails for many recipients with one prompt
+def generate_reschedule_messages(names, sender, fallback_slots):
+    if not fallback_slots:
+        logger.warning("⚠️ No fallback slots provided for reschedule message.")
+        return None
+
+    slot_text = "\n".join(
+        [f"- {slot['start']} to {slot['end']} UTC" for slot in fallback_slots]
+    )
+
+    def build_prompt(recipients):
+        return f"""
+You are a professional meeting assistant.
+
+Write a polite reschedule email to each of these recipients, saying that no common slot was found for the meeting:
+{recipients}
+
+Suggest the following time options for rescheduling:
+
+{slot_text}
+
+Address each email to its recipient by name. End each email kindly and professionally, signed by {sender}. Avoid mentioning this is AI-generated.
+"""
+
+    return generate_batch(names, build_prompt, "reschedule")
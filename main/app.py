@@ -1,15 +1,39 @@
-from flask import Flask, render_template, request
-from datetime import datetime
-from send_email import send_email
-from dateutil import parser
-import pytz
-import json
+from flask import Flask, Response, g, render_template, request, jsonify, url_for
+from werkzeug.exceptions import RequestEntityTooLarge
+from datetime import timedelta
+import logging
 import re
 import os
-from calendar_invite import generate_ics
-from zoom_meeting import create_zoom_meeting
-from ai_utils import generate_ai_message, generate_reschedule_message, rank_slots_with_gpt
-from send_email import send_email
+import time
+import importlib
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from calendar_invite import DEFAULT_TITLE, generate_ics
+from email_render import IST, MeetingRender
+from slot_engine import candidate_starts
+from availability_index import AvailabilityIndex
+from recurrence import RECURRENCE_HORIZON_DAYS, default_window, parse_rules
+from ics_import import WORK_END, WORK_START, read_calendar
+from proposals import make_proposal_store
+from slot_parser import parse_slots
+from fan_out import fan_out
+from stream_ingest import iter_calendar_users
+from batch_scheduler import SharedAvailability, assign_meetings
+from zoom_meeting import create_zoom_meeting, get_session
+from ai_utils import (
+    get_model, generate_ai_message, generate_ai_messages, generate_reschedule_message,
+    generate_reschedule_messages, rank_slots_with_gpt,
+    draft_cache, fill_meeting_link, LINK_PLACEHOLDER, GEMINI_TIMEOUT
+)
+from email_transport import get_outbox
+from jobs import JobQueue, make_job_store
+from metrics import REQUEST_SECONDS, render_metrics, stage
+from structured_logging import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
 
 
 app = Flask(
@@ -18,6 +42,57 @@ app = Flask(
     static_folder='../static'
 )
 app.config['UPLOAD_FOLDER'] = './'
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv("MAX_UPLOAD_MB", "50")) * 1024 * 1024
+
+# Meeting length defaults (minutes) and the start-time grid for candidate slots
+DEFAULT_DURATION = 30
+START_GRANULARITY = timedelta(minutes=15)
+MAX_CANDIDATES = 500
+
+# Seconds allowed for one meeting's Zoom + email dispatch in a batch
+BATCH_MEETING_TIMEOUT = 300
+
+# ⏳ Seconds Gemini gets to write confirmation emails, counted from when Zoom
+# creation starts; after that everyone without a draft gets the template
+EMAIL_LATENCY_BUDGET = float(os.getenv("EMAIL_LATENCY_BUDGET", "8"))
+
+# Threads writing confirmation emails while the Zoom meeting is created
+DRAFT_WORKERS = int(os.getenv("DRAFT_WORKERS", "8"))
+_draft_executor = None
+_draft_executor_lock = threading.Lock()
+
+# Background queue for POST /jobs scheduling requests
+job_queue = JobQueue(make_job_store())
+
+# Proposals awaiting the sender's confirmation, shared by all workers through the
+# job store. The token doubles as the meeting id whose availability index can be
+# edited one user at a time
+proposals = make_proposal_store(ttl_seconds=int(os.getenv("PROPOSAL_TTL", "900")))
+
+# Submission fields a proposal needs to send the invites later
+PROPOSAL_SETTINGS = ("sender_name", "custom_link", "custom_message", "duration", "buffer")
+
+# Uploads queued as jobs stay in memory up to this size, then spill to a temp file
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+# Client libraries the app otherwise imports on first use
+WARM_UP_MODULES = ["googleapiclient.discovery", "google_auth_oauthlib.flow", "google_auth_httplib2", "ics"]
+
+def warm_up():
+    """
+    Load the heavy client libraries and build the Gemini model and Zoom session
+    ahead of the first request. Run it in the gunicorn master with --preload
+    (WARM_UP_CLIENTS=1) so forked workers share the loaded pages copy-on-write.
+    No connections are opened here, so workers never share a socket.
+    """
+    for module in WARM_UP_MODULES:
+        importlib.import_module(module)
+    get_model()
+    get_session()
+    logger.info("🔥 Client libraries warmed up")
+
+if os.getenv("WARM_UP_CLIENTS") == "1":
+    warm_up()
 
 def clean_name(raw_input):
     if not raw_input:
@@ -26,250 +101,688 @@ def clean_name(raw_input):
     cleaned = re.sub(r'[^a-zA-Z\s]', ' ', cleaned)
     return cleaned.strip().title() or "User"
 
-def parse_slot(slot, timezone_str='Asia/Kolkata'):
-    try:
-        tz = pytz.timezone(timezone_str)
-        start = parser.parse(slot['start'])
-        end = parser.parse(slot['end'])
-        if start.tzinfo is None:
-            start = tz.localize(start)
-        if end.tzinfo is None:
-            end = tz.localize(end)
-        return {
-            "start": start.astimezone(pytz.utc),
-            "end": end.astimezone(pytz.utc)
-        }
-    except Exception as e:
-        print(f"Slot parse error: {e}")
-        return None
-
-def find_common_slots(users):
-    common_slots = users[0]
-    for i in range(1, len(users)):
-        next_user = users[i]
-        temp_common = []
-        for slot1 in common_slots:
-            for slot2 in next_user:
-                if not slot1 or not slot2:
-                    continue
-                start = max(slot1['start'], slot2['start'])
-                end = min(slot1['end'], slot2['end'])
-                if start < end:
-                    temp_common.append({"start": start, "end": end})
-        common_slots = temp_common
+def format_slots(slots):
     return [{
         "start": s["start"].strftime("%Y-%m-%d %H:%M"),
         "end": s["end"].strftime("%Y-%m-%d %H:%M")
-    } for s in common_slots]
-
+    } for s in slots]
+
+def batch_drafts(agents, generate):
+    """
+    Write every agent's email with one batched Gemini call. Returns a dict of
+    agent id -> email (agents whose entry didn't parse are left out), or None
+    if the batched call failed outright.
+    """
+    emails = generate([agent.name for agent in agents])
+    if emails is None:
+        return None
+    return {id(agent): email for agent, email in zip(agents, emails) if email}
+
+def get_draft_executor():
+    global _draft_executor
+    with _draft_executor_lock:
+        if _draft_executor is None:
+            _draft_executor = ThreadPoolExecutor(max_workers=DRAFT_WORKERS, thread_name_prefix="drafts")
+        return _draft_executor
+
+def start_confirmation_drafts(agents, slot, budget=EMAIL_LATENCY_BUDGET):
+    """
+    Start writing confirmation emails in the background, before the meeting
+    link exists (emails use LINK_PLACEHOLDER). Recipients with a cached email
+    for this slot are skipped. Answers that arrive after the budget are still
+    cached for next time.
+    """
+    pending = {"drafts": {}, "missing": [], "future": None, "expires_at": time.monotonic() + budget}
+    for agent in agents:
+        cached = draft_cache.get(agent.name, slot)
+        if cached:
+            pending["drafts"][id(agent)] = cached
+        else:
+            pending["missing"].append(agent)
+
+    missing = pending["missing"]
+    if missing and budget > 0:
+        def cache_drafts(future):
+            if future.cancelled() or future.exception() or not future.result():
+                return
+            for agent, email in zip(missing, future.result()):
+                if email:
+                    draft_cache.put(agent.name, slot, email)
+
+        # The call itself gets Gemini's full timeout so a late answer can still fill the cache
+        future = get_draft_executor().submit(
+            generate_ai_messages, [agent.name for agent in missing], slot, LINK_PLACEHOLDER
+        )
+        future.add_done_callback(cache_drafts)
+        pending["future"] = future
+    return pending
+
+def finish_confirmation_drafts(pending):
+    """
+    Wait out what is left of the budget. Returns agent id -> email like
+    batch_drafts: the cached drafts plus whatever Gemini wrote in time.
+    Recipients still missing get the template, since the budget is spent
+    (or closed early when the batched call failed).
+    """
+    drafts = dict(pending["drafts"])
+    if not pending["missing"] or pending["future"] is None:
+        return drafts
+    try:
+        emails = pending["future"].result(timeout=max(0, pending["expires_at"] - time.monotonic()))
+    except FutureTimeout:
+        logger.warning("⏳ Confirmation emails not written within budget, using templates",
+                       extra={"budget": EMAIL_LATENCY_BUDGET, "cached": len(drafts)})
+        return drafts
+    if emails is None:
+        # Don't spend the rest of the budget on per-recipient calls after the batch failed
+        pending["expires_at"] = time.monotonic()
+        return drafts
+    drafts.update({id(agent): email for agent, email in zip(pending["missing"], emails) if email})
+    return drafts
+
+def deliver(agents, compose, subject, ics_data=None):
+    """
+    Write every agent's email concurrently, then send them all through the
+    rate-limited outbox. Returns the fan_out results with each value set to
+    the message ID; emails the transport couldn't send are marked failed.
+    """
+    def timed_compose(agent):
+        with stage("generate"):
+            return compose(agent)
+
+    deliveries = fan_out(agents, timed_compose)
+    composed = [d for d in deliveries if d["status"] == "ok"]
+    with stage("send"):
+        outcomes = get_outbox().send([{
+            "to_email": d["item"].email,
+            "subject": subject,
+            "body_text": d["value"],
+            "ics_data": ics_data
+        } for d in composed])
+    for delivery, outcome in zip(composed, outcomes):
+        delivery["value"] = outcome["message_id"]
+        if outcome["status"] != "sent" and outcome["error"]:
+            delivery.update(status="failed", error=outcome["error"])
+    return deliveries
+
+def delivery_report(deliveries):
+    report = ""
+    for delivery in deliveries:
+        email = delivery["item"].email
+        if delivery["status"] == "timeout":
+            report += f"<br>⚠️ Email to {email} timed out."
+        elif delivery["status"] == "failed":
+            report += f"<br>⚠️ Email failed to send to {email}: {delivery['error']}"
+        elif not delivery["value"]:
+            report += f"<br>⚠️ Email failed to send to {email}."
+    return report
+
+# 👤 A recipient; their slots live only in the meeting's AvailabilityIndex
 class UserAgent:
-    def __init__(self, name, email, slots, timezone='Asia/Kolkata'):
+    def __init__(self, name, email, timezone='Asia/Kolkata'):
         self.name = name if name and name.strip() else "User"
         self.email = email
-        self.slots = slots
         self.timezone = timezone
 
-    def propose_slot(self, other_agents):
-        all_slots = [self.slots] + [agent.slots for agent in other_agents]
-        common_slots = find_common_slots(all_slots)
-        print("👉 Found Common Slots:", common_slots)
-        return rank_slots_with_gpt(common_slots)[0] if common_slots else None
+    def propose_slot(self, other_agents, common_slots):
+        logger.info("👉 Found Common Slots", extra={"count": len(common_slots), "first": common_slots[:1]})
+        timezones = [self.timezone] + [agent.timezone for agent in other_agents]
+        if not common_slots:
+            return None
+        with stage("rank"):
+            return rank_slots_with_gpt(common_slots, timezones)[0]
 
-    def generate_message(self, slot, meeting_link, custom_message=None):
+    def generate_message(self, slot, meeting_link, custom_message=None, ai_msg=None, use_ai=True, deadline=None,
+                         render=None):
         if custom_message:
             return f"""Dear {self.name},\n\n{custom_message}\n\n🔗 Meeting Link: {meeting_link}"""
 
+        # ✉️ Already written by a batched Gemini call
+        if ai_msg:
+            return ai_msg
+
         try:
-            print(f"🧠 Gemini called: Generating confirmation email for {self.name}...")
-            ai_msg = generate_ai_message(self.name, slot, meeting_link)
+            if deadline is None:
+                deadline = GEMINI_TIMEOUT
+            if not use_ai or deadline <= 0:
+                raise RuntimeError("no Gemini draft in time, skipping per-recipient call")
+            ai_msg = generate_ai_message(self.name, slot, meeting_link, deadline)
             if ai_msg:
-                print("✅ Gemini email generation complete.")
                 return ai_msg
         except Exception as e:
-            print("AI message generation failed:", e)
-
-        dt_start = parser.parse(slot['start'])
-        dt_end = parser.parse(slot['end'])
+            logger.info("AI message generation skipped: %s", e)
 
-        utc_start = dt_start.strftime('%I:%M %p')
-        utc_end = dt_end.strftime('%I:%M %p')
-        date = dt_start.strftime('%Y-%m-%d')
+        return (render or MeetingRender(slot)).confirmation(self.name, self.timezone, meeting_link)
 
-        ist = pytz.timezone('Asia/Kolkata')
-        ist_start = dt_start.astimezone(ist).strftime('%I:%M %p')
-        ist_end = dt_end.astimezone(ist).strftime('%I:%M %p')
+def read_minutes(value, default):
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return default
+
+def read_submission(form, files):
+    """
+    Copy everything the pipeline needs out of the request, so it can also run
+    in a background job after the request has finished.
+    """
+    file = files.get('calendar_file')
+    has_file = file and file.filename != ''
+    return {
+        "sender_name": form.get('sender_name', 'Smart Scheduler'),
+        "custom_link": form.get('custom_link'),
+        "custom_message": form.get('custom_message'),
+        "confirm": form.get('confirm_choice'),
+        "duration": read_minutes(form.get('duration'), DEFAULT_DURATION) or DEFAULT_DURATION,
+        "buffer": read_minutes(form.get('buffer'), 0),
+        "calendar_file": file.stream if has_file else None,
+        "calendar_filename": file.filename if has_file else "",
+        "ics_files": [(ics.filename, ics.stream) for ics in files.getlist('ics_files') if ics and ics.filename],
+        "ics_timezone": form.get('ics_timezone') or 'Asia/Kolkata',
+        "work_start": form.get('work_start') or WORK_START,
+        "work_end": form.get('work_end') or WORK_END,
+        "search_days": read_minutes(form.get('search_days'), RECURRENCE_HORIZON_DAYS) or RECURRENCE_HORIZON_DAYS,
+        "manual_entries": list(zip(
+            form.getlist('start_times[]'),
+            form.getlist('end_times[]'),
+            form.getlist('manual_emails[]'),
+            form.getlist('timezones[]')
+        ))
+    }
+
+@stage("parse")
+def build_agents(submission):
+    """
+    Stream every user's slots into UserAgents and an AvailabilityIndex.
+    Returns (agents, parse_errors, index), where agents maps each user's
+    index key to their UserAgent and parse_errors lists the slots that failed
+    for each user.
+
+    Every user is parsed and counted, but their slots are only kept in the
+    index (the agents hold what the emails need), and only until the common
+    set is empty or the roster is large; after that the index keeps one
+    packed bitmap row per user, which also feeds the reschedule fallback.
+    """
+    agents = {}
+    parse_errors = []
+    duration = timedelta(minutes=submission["duration"])
+    buffer = timedelta(minutes=submission["buffer"])
+    window = default_window(submission["search_days"])
+    index = AvailabilityIndex(min_length=duration + 2 * buffer, window=window)
+
+    def add_user(name, email, raw_slots, tz, keep_if_unparsed=True, raw_rules=None):
+        parsed_slots, errors = parse_slots(raw_slots, tz)
+        rules, rule_errors = parse_rules(raw_rules, tz) if raw_rules else ([], [])
+        if rule_errors and rule_errors[0]["slot"] is None:
+            rule_errors = []  # the unknown timezone is already reported by parse_slots
+        add_parsed_user(name, email, parsed_slots, tz, rules, errors + rule_errors, keep_if_unparsed)
+
+    def add_parsed_user(name, email, parsed_slots, tz, rules=(), errors=(), keep_if_unparsed=True):
+        if errors:
+            parse_errors.append({"user": email or name, "errors": list(errors)})
+        if not parsed_slots and not rules and not keep_if_unparsed:
+            return
+        key = email or name
+        if key in agents:
+            key = f"{key}#{len(agents)}"
+        agents[key] = UserAgent(name, email, tz)
+        index.add_user(key, parsed_slots, rules)
+
+    if submission["calendar_file"]:
+        for _, user_data in iter_calendar_users(submission["calendar_file"], submission["calendar_filename"]):
+            slots = user_data.get("slots")
+            recurrence = user_data.get("recurrence")
+            email = user_data.get("email")
+            tz = user_data.get("timezone", 'Asia/Kolkata')
+            raw_name = user_data.get("name") or (email.split('@')[0] if email else "")
+
+            if slots or recurrence:
+                add_user(clean_name(raw_name), email, slots or [], tz, raw_rules=recurrence)
+
+    # 📅 Exported .ics calendars: busy time inside the window, complemented against working hours
+    for filename, stream in submission["ics_files"]:
+        # Files are named after their owner (alice@example.com.ics) unless the calendar says otherwise
+        stem = filename.rsplit('.', 1)[0]
+        name = clean_name(stem.split('@')[0])
+        email = stem if '@' in stem else None
+        calendar = read_calendar(stream, *window, default_timezone=submission["ics_timezone"])
+        free_slots = calendar.busy.free_slots(*window, calendar.timezone, submission["work_start"], submission["work_end"])
+        add_parsed_user(name, calendar.owner or email, free_slots, calendar.timezone, errors=calendar.errors)
+
+    for start, end, email, tz in submission["manual_entries"]:
+        if start and end and email:
+            raw_name = email.split('@')[0] if '@' in email else 'User'
+            add_user(clean_name(raw_name), email.strip(), [{"start": start, "end": end}], tz,
+                     keep_if_unparsed=False)
+
+    return agents, parse_errors, index
+
+@stage("intersect")
+def meeting_candidates(availability, submission):
+    """
+    Concrete meeting times (formatted like find_common_slots) that fit the
+    requested duration and buffer inside the common slots.
+    """
+    return format_slots(candidate_starts(
+        availability.common_slots(),
+        timedelta(minutes=submission["duration"]),
+        timedelta(minutes=submission["buffer"]),
+        START_GRANULARITY,
+        MAX_CANDIDATES
+    ))
+
+def parse_error_report(parse_errors):
+    report = ""
+    for entry in parse_errors:
+        for error in entry["errors"]:
+            slot = error["slot"]
+            slot_text = f" ({slot.get('start')} to {slot.get('end')})" if slot else ""
+            report += f"<br>⚠️ Skipped a slot for {entry['user']}{slot_text}: {error['error']}"
+    return report
+
+def report_nothing(stage, status):
+    pass
+
+def schedule_meeting(agents, availability, top_slot, sender_name, custom_link, custom_message,
+                     duration=DEFAULT_DURATION, topic=None, progress=report_nothing):
+    """
+    Create the meeting and email every agent, or send reschedule requests when
+    there is no top slot; the reschedule suggestions come from the
+    availability index. Returns the result HTML. A `topic` names both the
+    Zoom meeting and the calendar invite.
+    """
+    if top_slot:
+        # ✍️ Gemini writes the emails while the Zoom meeting is being created
+        pending_drafts = None if custom_message else start_confirmation_drafts(agents, top_slot)
+
+        progress("zoom", "running")
+        with stage("zoom"):
+            meeting_link = custom_link or create_zoom_meeting(
+                start_time=top_slot['start'],
+                topic=topic or "AI Scheduled Meeting",
+                duration=duration
+            )
+        progress("zoom", "done")
+
+        progress("emails", "running")
+        # 📅 The invite is identical for everyone, so build it once before fanning out
+        with stage("invite"):
+            ics_data = generate_ics(top_slot['start'], top_slot['end'], meeting_link, title=topic or DEFAULT_TITLE)
+
+        with stage("generate_batch"):
+            drafts = {} if custom_message else finish_confirmation_drafts(pending_drafts)
+        # 🕒 Slot times are converted once per distinct attendee timezone
+        render = MeetingRender(top_slot)
+
+        def compose_confirmation(agent):
+            draft = drafts.get(id(agent)) if drafts else None
+            return agent.generate_message(
+                top_slot, meeting_link, custom_message,
+                ai_msg=fill_meeting_link(draft, meeting_link) if draft else None,
+                use_ai=drafts is not None,
+                deadline=pending_drafts["expires_at"] - time.monotonic() if pending_drafts else None,
+                render=render
+            )
 
-        try:
-            local_tz = pytz.timezone(self.timezone)
-        except:
-            local_tz = pytz.utc
-        local_start = dt_start.astimezone(local_tz).strftime('%I:%M %p')
-        local_end = dt_end.astimezone(local_tz).strftime('%I:%M %p')
-        local_label = self.timezone
+        deliveries = deliver(
+            agents,
+            compose_confirmation,
+            subject=f"Meeting Confirmation – Scheduled by {sender_name}",
+            ics_data=ics_data
+        )
+        progress("emails", "done")
 
         return f"""
-Dear {self.name},
+        <div class="result-box">
+            <strong>✅ Meeting Scheduled Successfully</strong><br><br>
+            <strong>🗓️ Date:</strong> {top_slot['start'].split()[0]}<br>
+            <strong>🕒 Time:</strong> {top_slot['start'].split()[1]} to {top_slot['end'].split()[1]} UTC<br><br>
+            Invitation emails have been sent to all participants.
+        </div>
+        """ + delivery_report(deliveries)
+
+    progress("zoom", "skipped")
+    progress("emails", "running")
+    with stage("intersect"):
+        fallback_slots = availability.best_partial_windows(limit=3) if availability else []
+    logger.info("🌀 Fallback Slots", extra={"fallback_slots": fallback_slots})
+
+    result = """
+    ❌ No common slots found.<br>
+    A polite reschedule request has been emailed to participants.
+    """
+    with stage("generate_batch"):
+        drafts = batch_drafts(
+            agents, lambda names: generate_reschedule_messages(names, sender_name, fallback_slots)
+        ) if fallback_slots else None
+
+    def compose_reschedule(agent):
+        msg_text = drafts.get(id(agent)) if drafts else None
+        if not msg_text and drafts is not None:
+            msg_text = generate_reschedule_message(agent.name, sender_name, fallback_slots)
+
+        if not msg_text:
+            logger.info("⚠️ No Gemini reschedule message, using fallback message.", extra={"recipient": agent.name})
+            msg_text = f"""Dear {agent.name},
 
-I hope you're doing well.
-
-We've successfully scheduled a meeting based on mutual availability:
-
-📅 Date: {date}
-
-🕒 Meeting Time:
-- UTC: {utc_start} to {utc_end}
-- IST (India): {ist_start} to {ist_end}
-- Your Time ({local_label}): {local_start} to {local_end}
-
-🔗 Meeting Link: {meeting_link}
-📌 Calendar Invite: Please find the attached .ics file to add this meeting to your calendar.
+Unfortunately, no mutual meeting slot was found.
 
-Looking forward to your presence.
+Kindly review your availability and suggest alternate time slots.
 
-Best regards,  
-Smart Scheduler Team
+Regards,  
+{sender_name}
 """
+        return msg_text
+
+    result += delivery_report(deliver(
+        agents,
+        compose_reschedule,
+        subject=f"Meeting Reschedule Request – From {sender_name}"
+    ))
+    progress("emails", "done")
+    return result
+
+def run_scheduling_job(submission, progress=report_nothing):
+    """
+    Full pipeline for a queued job. Jobs can't show the confirm page, so they
+    always send invites straight away.
+    """
+    progress("parse", "running")
+    try:
+        roster, parse_errors, availability = build_agents(submission)
+    finally:
+        if submission["calendar_file"]:
+            submission["calendar_file"].close()
+        for _, stream in submission["ics_files"]:
+            stream.close()
+    progress("parse", "done")
+    agents = list(roster.values())
+    if len(agents) < 2:
+        return "❌ Please provide time slots for at least 2 users." + parse_error_report(parse_errors)
+
+    progress("rank", "running")
+    top_slot = agents[0].propose_slot(agents[1:], meeting_candidates(availability, submission))
+    progress("rank", "done")
+
+    return schedule_meeting(
+        agents, availability, top_slot,
+        submission["sender_name"], submission["custom_link"], submission["custom_message"],
+        duration=submission["duration"], progress=progress
+    ) + parse_error_report(parse_errors)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # The route pattern, not the raw path, keeps job/meeting IDs out of the labels
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_SECONDS.labels(endpoint, request.method, response.status_code).observe(time.perf_counter() - started)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
+def confirm_proposal(proposal):
+    """
+    Send the invites for a confirmed proposal, reusing the agents and ranked
+    slot from the ask step. Candidates are only rebuilt if attendees were
+    edited through /meetings/<id>/users since, and the slot is only ranked
+    again if it no longer fits.
+    """
+    settings = proposal["settings"]
+    top_slot = proposal["slot"]
+    availability = proposal["availability"]
+
+    with availability.lock:
+        # 👥 Recipients are read from the roster the attendee edits kept in sync with the index
+        agents = list(proposal["agents"].values())
+        changed = availability.version != proposal["version"]
+        candidates = meeting_candidates(availability, settings) if changed else None
+    if len(agents) < 2:
+        return "❌ Please provide time slots for at least 2 users." + parse_error_report(proposal["parse_errors"])
+    if changed and top_slot not in candidates:
+        top_slot = agents[0].propose_slot(agents[1:], candidates)
+
+    return schedule_meeting(
+        agents, availability, top_slot,
+        settings["sender_name"], settings["custom_link"], settings["custom_message"],
+        duration=settings["duration"]
+    ) + parse_error_report(proposal["parse_errors"])
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
     result = ""
     if request.method == 'POST':
-        sender_name = request.form.get('sender_name', 'Smart Scheduler')
-        custom_link = request.form.get('custom_link')
-        custom_message = request.form.get('custom_message')
-        confirm = request.form.get('confirm_choice')
-
-        file = request.files.get('calendar_file')
-        start_times = request.form.getlist('start_times[]')
-        end_times = request.form.getlist('end_times[]')
-        manual_emails = request.form.getlist('manual_emails[]')
-        timezones = request.form.getlist('timezones[]')
-
-        all_users_slots = []
-        agents = []
-
-        if file and file.filename != '':
-            try:
-                data = json.load(file)
-                for _, user_data in data.items():
-                    slots = user_data.get("slots")
-                    email = user_data.get("email")
-                    tz = user_data.get("timezone", 'Asia/Kolkata')
-                    raw_name = user_data.get("name") or (email.split('@')[0] if email else "")
-                    name = clean_name(raw_name)
-
-                    if slots:
-                        parsed_slots = [parse_slot(slot, tz) for slot in slots if slot]
-                        all_users_slots.append(parsed_slots)
-                        agents.append(UserAgent(name, email, parsed_slots, tz))
-            except Exception as e:
-                result = f"<div class='text-red-600 font-semibold'>⚠️ Invalid JSON file: {e}</div>"
-                return render_template('index.html', result=result)
-
-        for start, end, email, tz in zip(start_times, end_times, manual_emails, timezones):
-            if start and end and email:
-                parsed = parse_slot({"start": start.strip(), "end": end.strip()}, tz)
-                if parsed:
-                    parsed_slots = [parsed]
-                    raw_name = email.split('@')[0] if '@' in email else 'User'
-                    name = clean_name(raw_name)
-                    all_users_slots.append(parsed_slots)
-                    agents.append(UserAgent(name, email.strip(), parsed_slots, tz))
+        token = request.form.get('proposal_token')
+        if token:
+            proposal = proposals.pop(token)
+            if proposal is None:
+                result = ("<div class='text-red-600 font-semibold'>⚠️ This proposal has expired or was already "
+                          "confirmed. Please submit the availability again.</div>")
+            else:
+                result = confirm_proposal(proposal)
+            return render_template('index.html', result=result)
 
-        if len(agents) < 2:
-            return render_template('index.html', result="❌ Please provide time slots for at least 2 users.")
-
-        top_slot = agents[0].propose_slot(agents[1:])
-
-        if top_slot:
-            if confirm == 'ask':
-                dt_start = parser.parse(top_slot['start'])
-                dt_end = parser.parse(top_slot['end'])
-
-                ist = pytz.timezone('Asia/Kolkata')
-                ist_start = dt_start.astimezone(ist).strftime('%I:%M %p')
-                ist_end = dt_end.astimezone(ist).strftime('%I:%M %p')
-                utc_start = dt_start.strftime('%I:%M %p')
-                utc_end = dt_end.strftime('%I:%M %p')
-                meeting_date = dt_start.astimezone(ist).strftime('%Y-%m-%d')
-
-                return render_template(
-                    'confirm.html',
-                    slot=top_slot,
-                    agents=agents,
-                    custom_link=custom_link,
-                    custom_message=custom_message,
-                    sender_name=sender_name,
-                    ist_start=ist_start,
-                    ist_end=ist_end,
-                    utc_start=utc_start,
-                    utc_end=utc_end,
-                    meeting_date=meeting_date
-                )
+        try:
+            submission = read_submission(request.form, request.files)
+            roster, parse_errors, availability = build_agents(submission)
+        except RequestEntityTooLarge:
+            raise
+        except Exception as e:
+            result = f"<div class='text-red-600 font-semibold'>⚠️ Invalid JSON file: {e}</div>"
+            return render_template('index.html', result=result)
 
-            meeting_link = custom_link or create_zoom_meeting(
-                start_time=top_slot['start'],
-                topic="AI Scheduled Meeting",
-                duration=30
+        agents = list(roster.values())
+        if len(agents) < 2:
+            result = "❌ Please provide time slots for at least 2 users." + parse_error_report(parse_errors)
+            return render_template('index.html', result=result)
+
+        top_slot = agents[0].propose_slot(agents[1:], meeting_candidates(availability, submission))
+
+        if top_slot and submission["confirm"] == 'ask':
+            render = MeetingRender(top_slot)
+            ist = render.times(IST)
+
+            proposal_token = proposals.add({
+                "agents": roster,
+                "parse_errors": parse_errors,
+                "availability": availability,
+                "version": availability.version,
+                "slot": top_slot,
+                "settings": {key: submission[key] for key in PROPOSAL_SETTINGS}
+            })
+
+            return render_template(
+                'confirm.html',
+                proposal_token=proposal_token,
+                custom_link=submission["custom_link"],
+                custom_message=submission["custom_message"],
+                ist_start=ist["start"],
+                ist_end=ist["end"],
+                utc_start=render.utc["start"],
+                utc_end=render.utc["end"],
+                meeting_date=ist["date"]
             )
 
-            for agent in agents:
-                msg_text = agent.generate_message(top_slot, meeting_link, custom_message)
-                ics_file = generate_ics(top_slot['start'], top_slot['end'], meeting_link)
-                try:
-                    send_email(
-                        to_email=agent.email,
-                        subject=f"Meeting Confirmation – Scheduled by {sender_name}",
-                        body_text=msg_text,
-                        ics_path=ics_file
-                    )
-                except Exception as e:
-                    result += f"<br>⚠️ Email failed to send to {agent.email}: {e}"
-
-            result = f"""
-            <div class="result-box">
-                <strong>✅ Meeting Scheduled Successfully</strong><br><br>
-                <strong>🗓️ Date:</strong> {top_slot['start'].split()[0]}<br>
-                <strong>🕒 Time:</strong> {top_slot['start'].split()[1]} to {top_slot['end'].split()[1]} UTC<br><br>
-                Invitation emails have been sent to all participants.
-            </div>
-            """
-        else:
-            fallback_slots = find_common_slots(all_users_slots)[:3]
-            print("🌀 Fallback Slots:", fallback_slots)
-
-            result = """
-            ❌ No common slots found.<br>
-            A polite reschedule request has been emailed to participants.
-            """
-            for agent in agents:
-                print(f"🧠 Gemini called: Generating reschedule email for {agent.name}...")
-                msg_text = generate_reschedule_message(agent.name, sender_name, fallback_slots)
-                if msg_text:
-                    print("✅ Gemini reschedule email done.")
-                else:
-                    print("⚠️ Gemini reschedule message failed, using fallback message.")
-
-                if not msg_text:
-                    msg_text = f"""Dear {agent.name},
+        result = schedule_meeting(
+            agents, availability, top_slot,
+            submission["sender_name"], submission["custom_link"], submission["custom_message"],
+            duration=submission["duration"]
+        ) + parse_error_report(parse_errors)
 
-Unfortunately, no mutual meeting slot was found.
-
-Kindly review your availability and suggest alternate time slots.
+    return render_template('index.html', result=result)
 
-Regards,  
-{sender_name}
-"""
-                try:
-                    send_email(
-                        to_email=agent.email,
-                        subject=f"Meeting Reschedule Request – From {sender_name}",
-                        body_text=msg_text
-                    )
-                except Exception as e:
-                    result += f"<br>⚠️ Email failed to send to {agent.email}: {e}"
+@app.route('/meetings/<meeting_id>/users/<user_key>', methods=['PUT', 'DELETE'])
+def update_meeting_user(meeting_id, user_key):
+    """
+    Add, update or remove one attendee's availability for a meeting awaiting
+    confirmation and return the new common slots. The meeting id is the
+    proposal token from the confirm page.
+    PUT takes JSON {"slots": [...], "recurrence": [...], "timezone": "...",
+    "name": "...", "email": "..."}; the email defaults to the user key when it
+    is an address. The attendee is added to or dropped from the invite list too.
+    """
+    # Held until the edit is stored, so edits on other workers wait their turn
+    with proposals.edit(meeting_id) as proposal:
+        if proposal is None:
+            return jsonify({"error": "Meeting not found or expired"}), 404
+
+        availability = proposal["availability"]
+        roster = proposal["agents"]
+
+        errors = []
+        with availability.lock:
+            if request.method == 'DELETE':
+                if user_key not in availability:
+                    return jsonify({"error": "User not found"}), 404
+                availability.remove_user(user_key)
+                roster.pop(user_key, None)
+            else:
+                data = request.get_json(silent=True) or {}
+                tz = data.get("timezone", 'Asia/Kolkata')
+                parsed_slots, errors = parse_slots(data.get("slots") or [], tz)
+                rules, rule_errors = parse_rules(data.get("recurrence") or [], tz)
+                errors += [error for error in rule_errors if error["slot"] is not None]
+                availability.add_user(user_key, parsed_slots, rules)
+
+                current = roster.get(user_key)
+                email = data.get("email") or (current.email if current else None)
+                if not email and '@' in user_key:
+                    email = user_key
+                raw_name = data.get("name") or (current.name if current else (email or user_key).split('@')[0])
+                roster[user_key] = UserAgent(clean_name(raw_name), email, tz)
+            common_slots = format_slots(availability.common_slots())
+
+    return jsonify({"common_slots": common_slots, "errors": errors})
+
+def dispatch_batch(plan, sender_name, progress=report_nothing):
+    """
+    Create the Zoom meetings and send the invites for every scheduled meeting
+    of a batch, several meetings at a time.
+    """
+    progress("parse", "done")
+    progress("rank", "done")
+    progress("zoom", "running")
+    progress("emails", "running")
+
+    def dispatch(entry):
+        return schedule_meeting(
+            entry["agents"], None, entry["slot"], sender_name,
+            entry["custom_link"], entry["custom_message"],
+            duration=entry["duration"], topic=entry["topic"]
+        )
+
+    outcomes = fan_out(plan, dispatch, timeout=BATCH_MEETING_TIMEOUT)
+    progress("zoom", "done")
+    progress("emails", "done")
 
-    return render_template('index.html', result=result)
+    result = ""
+    for outcome in outcomes:
+        topic = outcome["item"]["topic"]
+        if outcome["status"] == "ok":
+            result += f"<h3>{topic}</h3>{outcome['value']}"
+        else:
+            result += f"<h3>{topic}</h3>⚠️ Dispatch {outcome['status']}: {outcome['error']}"
+    return result
+
+@app.route('/meetings/batch', methods=['POST'])
+def schedule_batch():
+    """
+    Schedule many meetings over one shared roster. Takes JSON
+    {"sender_name", "users": {key: {name, email, timezone, slots}},
+     "meetings": [{"topic", "attendees": [key, ...], "duration", "buffer",
+                   "custom_link", "custom_message"}]}.
+    Slots are assigned right away so no attendee is double-booked; Zoom and
+    email dispatch runs as a background job.
+    """
+    data = request.get_json(silent=True) or {}
+    users = data.get("users") or {}
+    meetings = data.get("meetings") or []
+    sender_name = data.get("sender_name") or 'Smart Scheduler'
+
+    agents_by_key = {}
+    free_slots = {}
+    timezones = {}
+    parse_errors = []
+    for key, user_data in users.items():
+        email = user_data.get("email")
+        tz = user_data.get("timezone", 'Asia/Kolkata')
+        raw_name = user_data.get("name") or (email.split('@')[0] if email else "")
+        parsed_slots, errors = parse_slots(user_data.get("slots") or [], tz)
+        if errors:
+            parse_errors.append({"user": email or key, "errors": errors})
+        agents_by_key[key] = UserAgent(clean_name(raw_name), email, tz)
+        free_slots[key] = parsed_slots
+        timezones[key] = tz
+
+    specs = []
+    for number, meeting in enumerate(meetings, start=1):
+        attendees = meeting.get("attendees") or []
+        unknown = [key for key in attendees if key not in agents_by_key]
+        if unknown or len(attendees) < 2:
+            message = f"unknown attendees {unknown}" if unknown else "needs at least 2 attendees"
+            return jsonify({"error": f"Meeting {number}: {message}"}), 400
+        specs.append({
+            "topic": meeting.get("topic") or f"AI Scheduled Meeting {number}",
+            "attendees": list(dict.fromkeys(attendees)),
+            "duration": read_minutes(meeting.get("duration"), DEFAULT_DURATION) or DEFAULT_DURATION,
+            "buffer": read_minutes(meeting.get("buffer"), 0),
+            "custom_link": meeting.get("custom_link"),
+            "custom_message": meeting.get("custom_message")
+        })
+
+    assignments = assign_meetings(SharedAvailability(free_slots, timezones, START_GRANULARITY), specs)
+
+    plan = []
+    summary = []
+    for spec, slot in zip(specs, assignments):
+        formatted = format_slots([slot])[0] if slot else None
+        summary.append({"topic": spec["topic"], "attendees": spec["attendees"], "slot": formatted})
+        if formatted:
+            plan.append(dict(spec, slot=formatted, agents=[agents_by_key[key] for key in spec["attendees"]]))
+
+    job_id = job_queue.submit(dispatch_batch, plan, sender_name) if plan else None
+    return jsonify({
+        "assignments": summary,
+        "parse_errors": parse_errors,
+        "job_id": job_id,
+        "status_url": url_for('job_status', job_id=job_id) if job_id else None
+    }), 202 if job_id else 200
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    limit_mb = app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+    result = f"<div class='text-red-600 font-semibold'>⚠️ Upload is larger than the {limit_mb} MB limit.</div>"
+    return render_template('index.html', result=result), 413
+
+def spool_upload(stream):
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    shutil.copyfileobj(stream, spooled)
+    spooled.seek(0)
+    return spooled
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    submission = read_submission(request.form, request.files)
+    # The request's upload streams close when we return, so the job gets its own copies
+    if submission["calendar_file"]:
+        submission["calendar_file"] = spool_upload(submission["calendar_file"])
+    submission["ics_files"] = [(filename, spool_upload(stream)) for filename, stream in submission["ics_files"]]
+
+    job_id = job_queue.submit(run_scheduling_job, submission)
+    return jsonify({"job_id": job_id, "status_url": url_for('job_status', job_id=job_id)}), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
 
 if __name__ == '__main__':
     app.run(debug=True)
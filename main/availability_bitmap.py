@@ -0,0 +1,198 @@
+import math
+from datetime import timedelta
+
+import numpy as np
+
+# ⏱️ Default bitmap resolution (one bit per 5 minutes)
+DEFAULT_RESOLUTION = 5
+
+
+# 📏 Work out the search window covering the users' slots, at most `horizon` long
+def search_window(users, horizon=None):
+    """
+    From the earliest slot start to the latest slot end. With a `horizon`
+    (window_start, window_end), time before window_start is dropped when
+    any slot reaches past it, and the window is cut to the horizon's length,
+    so one far-off slot can't blow up the bitmap.
+    """
+    slots = [slot for user_slots in users for slot in user_slots if slot]
+    if not slots:
+        return None, None
+    window_start = min(slot['start'] for slot in slots)
+    window_end = max(slot['end'] for slot in slots)
+    if horizon:
+        if window_end > horizon[0]:
+            window_start = max(window_start, horizon[0])
+        window_end = min(window_end, window_start + (horizon[1] - horizon[0]))
+    return window_start, window_end
+
+
+# 🧱 Pack one user's slots into a row of bits over [window_start, window_start + bins * step)
+def pack_row(slots, window_start, bins, step):
+    """
+    One bit per `step` seconds, set where the user is free for the whole bin,
+    packed with np.packbits, so 1,000 users x 30 days at 5 minutes is about 1 MB.
+    """
+    starts = []
+    ends = []
+    for slot in slots:
+        if not slot:
+            continue
+        # Only bins fully covered by the slot count as free
+        first = math.ceil((slot['start'] - window_start).total_seconds() / step)
+        last = math.floor((slot['end'] - window_start).total_seconds() / step)
+        first, last = max(first, 0), min(last, bins)
+        if first < last:
+            starts.append(first)
+            ends.append(last)
+    if not starts:
+        return np.zeros((bins + 7) // 8, dtype=np.uint8)
+
+    # ➕ Difference array + cumulative sum marks every free bin in one pass
+    delta = np.zeros(bins + 1, dtype=np.int32)
+    np.add.at(delta, starts, 1)
+    np.add.at(delta, ends, -1)
+    return np.packbits(np.cumsum(delta[:-1]) > 0)
+
+
+# 🔍 Find runs of consecutive bins where `mask` is set, as (first_bin, end_bin) pairs
+def find_runs(mask):
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+# 🕒 Convert a bin index back into a "YYYY-MM-DD HH:MM" UTC string
+def bin_to_time(window_start, index, resolution):
+    return (window_start + timedelta(minutes=int(index) * resolution)).strftime("%Y-%m-%d %H:%M")
+
+
+class AvailabilityBitmap:
+    """
+    Packed occupancy bitmaps over a fixed window, one row per user key, plus
+    the number of free users in every bin. Users can be added, replaced and
+    removed one at a time, and only their packed row is kept, so memory is
+    set by the roster size and window, not by how many slots were uploaded.
+    """
+
+    def __init__(self, window_start, window_end, resolution=DEFAULT_RESOLUTION):
+        # Bins start on a resolution boundary so windows come out on round times
+        self.window_start = window_start.replace(
+            minute=window_start.minute - window_start.minute % resolution, second=0, microsecond=0
+        )
+        self.window_end = window_end
+        self.resolution = resolution
+        self.step = resolution * 60
+        self.bins = max(0, math.ceil((window_end - self.window_start).total_seconds() / self.step))
+        self.rows = {}  # user key -> packed row
+        self.counts = np.zeros(self.bins, dtype=np.int32)
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, key, slots):
+        row = pack_row(slots, self.window_start, self.bins, self.step)
+        if key in self.rows:
+            # Replaced in place, so the key keeps its position in the roster order
+            self.counts -= np.unpackbits(self.rows[key], count=self.bins)
+        self.counts += np.unpackbits(row, count=self.bins)
+        self.rows[key] = row
+
+    def remove(self, key):
+        row = self.rows.pop(key)
+        self.counts -= np.unpackbits(row, count=self.bins)
+
+    def _time(self, index):
+        return self.window_start + timedelta(minutes=int(index) * self.resolution)
+
+    def common_windows(self):
+        """
+        {"start", "end"} UTC datetimes of the ranges where every user is free.
+        """
+        if not self.rows:
+            return []
+        return [{"start": self._time(first), "end": self._time(end)}
+                for first, end in find_runs(self.counts == len(self.rows))]
+
+    # ✂️ Within one run of bins, the windows where the same `count` people stay free throughout
+    def _shared_windows(self, packed, first, end, count, min_bins):
+        offset = first % 8
+        byte_range = packed[:, first // 8:(end + 7) // 8]
+        columns = np.unpackbits(byte_range, axis=1)[:, offset:offset + end - first]
+        # The same head-count can hide a change of people, so split where membership changes
+        changes = np.flatnonzero((columns[:, 1:] != columns[:, :-1]).any(axis=0)) + 1
+        bounds = [0] + changes.tolist() + [end - first]
+
+        windows = []
+        last_end = None
+        for i, lo in enumerate(bounds[:-1]):
+            # Grow from this piece while enough of its people stay free
+            present = columns[:, lo]
+            hi = None
+            for j in range(i, len(bounds) - 1):
+                together = present & columns[:, bounds[j]]
+                if together.sum() < count:
+                    break
+                present, hi = together, bounds[j + 1]
+            # A window ending where the previous one did lies inside it
+            if hi is not None and hi - lo >= min_bins and hi != last_end:
+                windows.append((first + lo, first + hi, present))
+                last_end = hi
+        return windows
+
+    # 🥈 Best partial overlaps, e.g. 9 of 10 attendees, when nobody-left-out isn't possible
+    def best_partial_windows(self, limit=3, min_length=None):
+        """
+        Return up to `limit` windows where the largest number of users are
+        free for at least `min_length`, longest first. Each window includes
+        the attendee count and the keys of the users who are missing.
+        """
+        if not self.rows or not self.bins:
+            return []
+        min_bins = max(1, math.ceil(min_length.total_seconds() / self.step)) if min_length else 1
+        keys = list(self.rows)
+        packed = np.vstack(list(self.rows.values()))
+
+        # 🔽 Step down from the best head-count until some window is long enough for the meeting
+        candidates = []
+        best = int(self.counts.max())
+        while best > 0:
+            for first, end in find_runs(self.counts >= best):
+                if end - first >= min_bins:
+                    candidates.extend(self._shared_windows(packed, first, end, best, min_bins))
+            if candidates:
+                break
+            best -= 1
+        if not candidates:
+            return []
+        candidates.sort(key=lambda run: (run[0] - run[1], run[0]))
+
+        return [{
+            "start": bin_to_time(self.window_start, first, self.resolution),
+            "end": bin_to_time(self.window_start, end, self.resolution),
+            "attendees": int(present.sum()),
+            "total": len(keys),
+            "missing": [keys[i] for i in np.flatnonzero(present == 0).tolist()]
+        } for first, end, present in candidates[:limit]]
+
+
+# 🤝 Common slots for all users, computed with a vectorised AND over the bitmaps
+def find_common_windows(users, resolution=DEFAULT_RESOLUTION, horizon=None):
+    """
+    Like slot_engine.intersect_slots, at `resolution`-minute precision, with
+    times formatted as "YYYY-MM-DD HH:MM" UTC.
+    """
+    window_start, window_end = search_window(users, horizon)
+    if window_start is None or window_start >= window_end or not all(any(slots) for slots in users):
+        return []
+    bitmap = AvailabilityBitmap(window_start, window_end, resolution)
+    for index, slots in enumerate(users):
+        bitmap.add(index, slots)
+    return [{
+        "start": slot['start'].strftime("%Y-%m-%d %H:%M"),
+        "end": slot['end'].strftime("%Y-%m-%d %H:%M")
+    } for slot in bitmap.common_windows()]
@@ -0,0 +1,212 @@
+import bisect
+import os
+import threading
+
+from availability_bitmap import AvailabilityBitmap, search_window
+from slot_engine import merge_slots, intersect_slots, iter_intersect_slots, drop_short_slots
+from recurrence import availability_stream, default_window, expand_slots
+
+# 👥 Rosters this large read their common slots from the vectorised bitmap
+BITMAP_MIN_USERS = int(os.getenv("BITMAP_MIN_USERS", "50"))
+
+
+class AvailabilityIndex:
+    """
+    Per-meeting interval counter: every slot boundary holds +1/-1 for the users
+    who start/stop being free there. Adding, removing or updating one user only
+    touches that user's boundaries, and the common slots are the ranges where
+    the running count equals the number of users.
+
+    With `min_length`, slots and overlaps too short to hold the meeting are
+    pruned as they come in, which keeps the index small for big rosters.
+
+    Users with recurrence rules are kept out of the counter: their occurrences
+    are generated lazily when the common slots are read, within the range the
+    one-off users' common slots span (or `window` when everyone recurs).
+
+    With a `window`, every user is also packed into an AvailabilityBitmap as
+    long as the window (starting earlier if the first user's slots are all
+    before it), which also gives the best partial overlaps. Once the roster
+    reaches BITMAP_MIN_USERS, or the common set is empty so adding users can't
+    bring a meeting back, the per-user slot lists are dropped: users are only
+    packed from then on, so memory no longer grows with the number of slots,
+    and the common slots come from the bitmap at its 5-minute resolution.
+    """
+
+    def __init__(self, min_length=None, window=None):
+        self.min_length = min_length
+        self.window = window
+        self.users = {}   # user key -> merged slots
+        self.recurring = {}  # user key -> (one-off slots, rules)
+        self.bitmap = None  # built for the first user, see _pack
+        self.exact = True  # False once slot lists are dropped for the bitmap
+        self.deltas = {}  # boundary time -> change in free-user count
+        self.times = []   # sorted boundary times
+        self._common = []
+        self.version = 0  # bumped on every change, so holders can tell the index was edited
+        self.lock = threading.Lock()  # held by callers that share the index between requests
+
+    # 📦 Pickled with the proposal it belongs to; the lock is per process
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self.users or key in self.recurring
+
+    def __len__(self):
+        return len(self.users) + len(self.recurring)
+
+    def _bump(self, time_point, change):
+        if time_point in self.deltas:
+            self.deltas[time_point] += change
+            if self.deltas[time_point] == 0:
+                del self.deltas[time_point]
+                del self.times[bisect.bisect_left(self.times, time_point)]
+        else:
+            self.deltas[time_point] = change
+            bisect.insort(self.times, time_point)
+
+    def _apply(self, slots, sign):
+        for slot in slots:
+            self._bump(slot['start'], sign)
+            self._bump(slot['end'], -sign)
+
+    def _recount(self):
+        total = len(self.users)
+        common = []
+        active = 0
+        opened_at = None
+        for time_point in self.times:
+            was_common = total and active == total
+            active += self.deltas[time_point]
+            if was_common and active != total:
+                common.append({"start": opened_at, "end": time_point})
+            elif not was_common and total and active == total:
+                opened_at = time_point
+        self._common = drop_short_slots(common, self.min_length)
+
+    def _pack(self, key, slots, rules):
+        if not self.window:
+            return
+        if self.bitmap is None:
+            start = search_window([slots], self.window)[0] or self.window[0]
+            self.bitmap = AvailabilityBitmap(start, start + (self.window[1] - self.window[0]))
+        if rules:
+            slots = expand_slots(slots, rules, self.bitmap.window_start, self.bitmap.window_end)
+        self.bitmap.add(key, slots)
+
+    # 🧮 Keep only the bitmap from here on
+    def _drop_slot_lists(self):
+        self.users = dict.fromkeys(self.users)
+        self.recurring = dict.fromkeys(self.recurring)
+        self.deltas = {}
+        self.times = []
+        self._common = []
+        self.exact = False
+
+    # The plain list while nobody recurs, so streaming big rosters doesn't copy it per user
+    def _result(self):
+        return self.common_slots() if self.recurring or not self.exact else self._common
+
+    def add_user(self, key, slots, rules=None):
+        """
+        Add a user's slots (and recurrence rules). The cached common set only
+        needs intersecting with the new user, so nobody else's slots are looked at.
+        """
+        if key in self:
+            return self.update_user(key, slots, rules)
+        if self.exact and self.bitmap is not None and (
+                len(self) + 1 >= BITMAP_MIN_USERS or (self.users and not self._common)):
+            self._drop_slot_lists()
+        return self._insert(key, slots, rules)
+
+    def _insert(self, key, slots, rules):
+        self._pack(key, slots, rules)
+        if not self.exact:
+            (self.recurring if rules else self.users)[key] = None
+            self.version += 1
+            return self.common_slots()
+        if rules:
+            self.recurring[key] = (slots, rules)
+            self.version += 1
+            return self.common_slots()
+        # merge_slots joins back-to-back slots, so boundaries cancel cleanly in the counter
+        merged = drop_short_slots(merge_slots(slots), self.min_length)
+        if self.users:
+            self._common = intersect_slots([self._common, merged], self.min_length)
+        else:
+            self._common = [dict(slot) for slot in merged]
+        self.users[key] = merged
+        self._apply(merged, 1)
+        self.version += 1
+        return self._result()
+
+    def remove_user(self, key):
+        if self.bitmap is not None:
+            self.bitmap.remove(key)
+        return self._drop(key)
+
+    def _drop(self, key):
+        if not self.exact:
+            self.users.pop(key, None)
+            self.recurring.pop(key, None)
+            self.version += 1
+            return self.common_slots()
+        if key in self.recurring:
+            del self.recurring[key]
+            self.version += 1
+            return self.common_slots()
+        merged = self.users.pop(key)
+        self._apply(merged, -1)
+        self._recount()
+        self.version += 1
+        return self._result()
+
+    def update_user(self, key, slots, rules=None):
+        if key in self.recurring or rules or not self.exact:
+            # The bitmap row is replaced in place, so the user keeps their position
+            self._drop(key)
+            return self._insert(key, slots, rules)
+        merged = drop_short_slots(merge_slots(slots), self.min_length)
+        self._pack(key, merged, None)
+        self._apply(self.users[key], -1)
+        self.users[key] = merged
+        self._apply(merged, 1)
+        self._recount()
+        self.version += 1
+        return self._result()
+
+    def common_slots(self):
+        """
+        The common slots as a list, or as a lazy iterator once a user has
+        recurrence rules.
+        """
+        if not self.exact:
+            return drop_short_slots(self.bitmap.common_windows(), self.min_length)
+        if not self.recurring:
+            return list(self._common)
+        if self.users:
+            if not self._common:
+                return iter([])
+            window = (self._common[0]['start'], self._common[-1]['end'])
+        else:
+            window = self.window or default_window()
+        streams = [availability_stream(slots, rules, *window) for slots, rules in self.recurring.values()]
+        if self.users:
+            streams.append(iter(self._common))
+        return iter_intersect_slots(streams, self.min_length)
+
+    def best_partial_windows(self, limit=3):
+        """
+        The reschedule fallback: AvailabilityBitmap.best_partial_windows over
+        every user, in the order added, at least `min_length` long.
+        """
+        if self.bitmap is None:
+            return []
+        return self.bitmap.best_partial_windows(limit, self.min_length)
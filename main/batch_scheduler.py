@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from slot_engine import merge_slots, intersect_slots, candidate_starts
+from slot_scoring import rank_slots_locally
+
+# 🗓️ Candidate meeting times considered per meeting
+MAX_CANDIDATES = 500
+
+
+# ➖ Remove a busy range from a sorted, merged slot list
+def subtract_busy(slots, busy):
+    free = []
+    for slot in slots:
+        if slot['end'] <= busy['start'] or slot['start'] >= busy['end']:
+            free.append(slot)
+            continue
+        if slot['start'] < busy['start']:
+            free.append({"start": slot['start'], "end": busy['start']})
+        if slot['end'] > busy['end']:
+            free.append({"start": busy['end'], "end": slot['end']})
+    return free
+
+
+class SharedAvailability:
+    """
+    One availability index shared by every meeting in a batch: each user's
+    free slots, shrunk as meetings get booked so nobody is double-booked.
+    """
+
+    def __init__(self, free_slots, timezones, granularity=timedelta(minutes=15)):
+        self.free = {key: merge_slots(slots) for key, slots in free_slots.items()}
+        self.timezones = timezones
+        self.granularity = granularity
+
+    def candidates(self, meeting):
+        duration = timedelta(minutes=meeting["duration"])
+        buffer = timedelta(minutes=meeting["buffer"])
+        common = intersect_slots([self.free[key] for key in meeting["attendees"]], duration + 2 * buffer)
+        return candidate_starts(common, duration, buffer, self.granularity, MAX_CANDIDATES)
+
+    def book(self, meeting, slot):
+        buffer = timedelta(minutes=meeting["buffer"])
+        busy = {"start": slot['start'] - buffer, "end": slot['end'] + buffer}
+        for key in meeting["attendees"]:
+            self.free[key] = subtract_busy(self.free[key], busy)
+
+
+def assign_meetings(availability, meetings):
+    """
+    Greedily give every meeting a slot that doesn't clash with any other
+    meeting sharing an attendee. Meetings with the fewest options (then the
+    most attendees) go first, and each takes its best locally scored time.
+    Returns one {"start", "end"} datetime slot per meeting, or None where no
+    slot was left.
+    """
+    option_counts = [len(availability.candidates(meeting)) for meeting in meetings]
+    order = sorted(range(len(meetings)), key=lambda i: (option_counts[i], -len(meetings[i]["attendees"])))
+
+    assignments = [None] * len(meetings)
+    for i in order:
+        meeting = meetings[i]
+        options = availability.candidates(meeting)
+        if not options:
+            continue
+        formatted = {o['start'].strftime("%Y-%m-%d %H:%M"): o for o in options}
+        ranked = rank_slots_locally(
+            [{"start": start, "end": o['end'].strftime("%Y-%m-%d %H:%M")} for start, o in formatted.items()],
+            [availability.timezones.get(key, 'UTC') for key in meeting["attendees"]]
+        )
+        chosen = formatted[ranked[0]['start']]
+        availability.book(meeting, chosen)
+        assignments[i] = chosen
+    return assignments
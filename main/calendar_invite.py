@@ -1,29 +1,46 @@
-from ics import Calendar, Event
 from datetime import datetime
 import pytz
 import uuid
 
-# Function to generate a .ics (calendar invite) file
-def generate_ics(start_str, end_str, meeting_url="https://zoom.us/my/smartmeeting"):
+# Convert a slot time (string or datetime) into a UTC datetime
+def to_utc_datetime(value):
+    if isinstance(value, str):
+        # ✅ Remove extra spaces and " UTC" from the time string
+        value = value.strip().replace(" UTC", "")
+        try:
+            value = datetime.strptime(value, "%Y-%m-%d %H:%M")
+        except ValueError:
+            value = datetime.fromisoformat(value)
+
+    # Force UTC timezone if not present
+    if value.tzinfo is None:
+        return pytz.utc.localize(value)
+    return value.astimezone(pytz.utc)
+
+# Invite title when the meeting has no topic of its own
+DEFAULT_TITLE = "🤖 Smart AI Meeting"
+
+# Function to generate a .ics (calendar invite) for a meeting
+def generate_ics(start, end, meeting_url="https://zoom.us/my/smartmeeting", title=DEFAULT_TITLE):
     """
-    Generate a .ics calendar invite file for Smart AI Meeting.
+    Generate the .ics calendar invite text for Smart AI Meeting.
+    Build it once per meeting and attach the same text to every email.
     """
+    # ics is imported here so it only loads once a meeting is actually booked
+    from ics import Calendar, Event
 
-    # ✅ Remove extra spaces and " UTC" from start and end time strings
-    start_str = start_str.strip().replace(" UTC", "")
-    end_str = end_str.strip().replace(" UTC", "")
-
-    # ✅ Convert the cleaned time strings into datetime objects in UTC timezone
-    start_dt = datetime.strptime(start_str, "%Y-%m-%d %H:%M").replace(tzinfo=pytz.utc)
-    end_dt = datetime.strptime(end_str, "%Y-%m-%d %H:%M").replace(tzinfo=pytz.utc)
+    # ✅ Convert the start and end times into datetime objects in UTC timezone
+    start_dt = to_utc_datetime(start)
+    end_dt = to_utc_datetime(end)
 
     # 📌 Create a calendar event
     event = Event()
     event.uid = str(uuid.uuid4())  # Generate a unique ID for the event
-    event.name = "🤖 Smart AI Meeting"  # Title of the meeting
+    event.name = title  # Title of the meeting
     event.begin = start_dt  # Event start time
     event.end = end_dt  # Event end time
     event.location = meeting_url  # Location or meeting link
+    event.url = meeting_url
     event.description = f"""Zoom Meeting Link: {meeting_url}
     
 Please join the meeting on time from any device."""  # Event description
@@ -32,10 +49,5 @@ Please join the meeting on time from any device."""  # Event description
     cal = Calendar()
     cal.events.add(event)
 
-    # 💾 Save the calendar with event into a file named 'meeting.ics'
-    file_path = "meeting.ics"
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.writelines(cal.serialize_iter())
-
-    # Return the file path for further use (like email attachment)
-    return file_path
+    # Return the serialized calendar for use as an email attachment
+    return cal.serialize()
@@ -1,31 +1,22 @@
 from datetime import datetime
+from slot_engine import intersect_slots
 
 # This function converts a string time like "14:30" into a datetime object
 def parse_time(time_str):
     return datetime.strptime(time_str, "%H:%M")
 
+# Convert a list of "HH:MM" slots into datetime slots the sweep engine can compare
+def to_datetime_slots(slots):
+    return [{'start': parse_time(s['start']), 'end': parse_time(s['end'])} for s in slots if s]
+
 # This function finds overlapping time slots between two users
 def find_overlap(slots1, slots2):
-    overlap = []
-    for a in slots1:
-        for b in slots2:
-            # Get the latest start time and the earliest end time
-            start = max(parse_time(a['start']), parse_time(b['start']))
-            end = min(parse_time(a['end']), parse_time(b['end']))
-
-            # If the start time is before the end time, it's a valid overlap
-            if start < end:
-                overlap.append({
-                    'start': start.strftime("%H:%M"),  # Convert back to string format
-                    'end': end.strftime("%H:%M")
-                })
-    return overlap
+    return find_common_slots([slots1, slots2])
 
 # This function takes a list of calendars (one per user) and finds time slots common to all users
 def find_common_slots(calendars):
-    common = calendars[0]  # Start with the first user's slots
-    for cal in calendars[1:]:  # Check overlap with each remaining user's slots
-        common = find_overlap(common, cal)  # Update common slots
-        if not common:
-            break  # If no overlap found at any step, stop early
-    return common
+    common = intersect_slots([to_datetime_slots(cal) for cal in calendars])
+    return [{
+        'start': s['start'].strftime("%H:%M"),  # Convert back to string format
+        'end': s['end'].strftime("%H:%M")
+    } for s in common]
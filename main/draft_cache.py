@@ -0,0 +1,22 @@
+from ttl_cache import TTLCache
+
+
+class DraftCache(TTLCache):
+    """
+    LRU + TTL cache of Gemini-written confirmation emails, keyed by recipient
+    name and meeting slot. Bodies are stored with the meeting link left as a
+    placeholder so they can be reused for a new meeting at the same time.
+    """
+
+    def __init__(self, max_size=1024, ttl_seconds=86400):
+        super().__init__(max_size, ttl_seconds)
+
+    @staticmethod
+    def _key(name, slot):
+        return (name, slot['start'], slot['end'])
+
+    def get(self, name, slot):
+        return self.lookup(self._key(name, slot))
+
+    def put(self, name, slot, body):
+        self.store(self._key(name, slot), body)
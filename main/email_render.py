@@ -0,0 +1,102 @@
+import threading
+from functools import lru_cache
+
+import pytz
+from dateutil import parser
+from jinja2 import Environment
+
+TIME_FORMAT = '%I:%M %p'
+DATE_FORMAT = '%Y-%m-%d'
+IST = 'Asia/Kolkata'
+
+# ✉️ Confirmation email body, compiled once at import
+_env = Environment(autoescape=False, keep_trailing_newline=True)
+CONFIRMATION_TEMPLATE = _env.from_string("""
+Dear {{ name }},
+
+I hope you're doing well.
+
+We've successfully scheduled a meeting based on mutual availability:
+
+📅 Date: {{ date }}
+
+🕒 Meeting Time:
+- UTC: {{ utc.start }} to {{ utc.end }}
+- IST (India): {{ ist.start }} to {{ ist.end }}
+- Your Time ({{ local_label }}): {{ local.start }} to {{ local.end }}
+
+🔗 Meeting Link: {{ meeting_link }}
+📌 Calendar Invite: Please find the attached .ics file to add this meeting to your calendar.
+
+Looking forward to your presence.
+
+Best regards,  
+Smart Scheduler Team
+""")
+
+
+@lru_cache(maxsize=512)
+def resolve_timezone(name):
+    """
+    pytz zone for a user's timezone string, falling back to UTC for unknown ones.
+    """
+    try:
+        return pytz.timezone(name)
+    except Exception:
+        return pytz.utc
+
+
+# 🕒 Slot times are UTC; naive values must not be read as server-local time
+def parse_utc(value):
+    dt = parser.parse(value)
+    if dt.tzinfo is None:
+        return pytz.utc.localize(dt)
+    return dt.astimezone(pytz.utc)
+
+
+class MeetingRender:
+    """
+    Rendering context for one meeting slot: the slot is parsed once and its
+    formatted times are memoized per timezone, so emailing N attendees costs
+    one conversion per distinct timezone rather than one per attendee.
+    """
+
+    def __init__(self, slot):
+        self.slot = slot
+        self.start = parse_utc(slot['start'])
+        self.end = parse_utc(slot['end'])
+        self.date = self.start.strftime(DATE_FORMAT)
+        self.utc = {"start": self.start.strftime(TIME_FORMAT), "end": self.end.strftime(TIME_FORMAT)}
+        self._zones = {}
+        self._lock = threading.Lock()
+
+    def times(self, timezone):
+        """
+        {"start", "end", "date"} strings for the slot in `timezone`.
+        """
+        tz = resolve_timezone(timezone) if isinstance(timezone, str) else pytz.utc
+        with self._lock:
+            cached = self._zones.get(tz.zone)
+        if cached:
+            return cached
+
+        local_start = self.start.astimezone(tz)
+        local_end = self.end.astimezone(tz)
+        cached = {
+            "start": local_start.strftime(TIME_FORMAT),
+            "end": local_end.strftime(TIME_FORMAT),
+            "date": local_start.strftime(DATE_FORMAT)
+        }
+        with self._lock:
+            return self._zones.setdefault(tz.zone, cached)
+
+    def confirmation(self, name, timezone, meeting_link):
+        return CONFIRMATION_TEMPLATE.render(
+            name=name,
+            date=self.date,
+            utc=self.utc,
+            ist=self.times(IST),
+            local=self.times(timezone),
+            local_label=timezone,
+            meeting_link=meeting_link
+        )
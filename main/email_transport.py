@@ -0,0 +1,322 @@
+import logging
+import os
+import queue
+import random
+import smtplib
+import threading
+import time
+from email.utils import make_msgid
+
+import send_email
+from send_email import build_mime
+from metrics import external_call, record_external_error
+
+logger = logging.getLogger(__name__)
+
+# 📍 Base path to root project directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ✉️ Which transport sends the emails: gmail, smtp or spool
+EMAIL_TRANSPORT = os.getenv("EMAIL_TRANSPORT", "gmail")
+
+# 🚦 Outbound pacing: messages per second (0 = unlimited, unset = the transport's
+# default) and how many can go out at once before pacing kicks in
+EMAIL_RATE = os.getenv("EMAIL_RATE")
+EMAIL_BURST = int(os.getenv("EMAIL_BURST", "50"))
+
+# 🔁 Sends per message (first try included) and the base delay before retrying deferred ones
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+EMAIL_RETRY_DELAY = float(os.getenv("EMAIL_RETRY_DELAY", "2"))
+
+# ⏱️ Default seconds Outbox.send may spend on one call, pacing and retries included
+EMAIL_SEND_DEADLINE = float(os.getenv("EMAIL_SEND_DEADLINE", "60"))
+
+
+def outcome(status, message_id=None, error=None):
+    return {"status": status, "message_id": message_id, "error": error}
+
+
+class GmailTransport:
+    """
+    Sends through the Gmail API batch endpoint (send_email.send_batch_outcomes).
+    """
+    name = "gmail"
+    batch_size = send_email.BATCH_SIZE
+    # Gmail allows 250 quota units per second per user and a send costs 100
+    default_rate = 2.5
+
+    def send(self, messages):
+        return send_email.send_batch_outcomes(messages)
+
+
+class SMTPTransport:
+    """
+    Sends over a pool of persistent SMTP connections, so a burst of emails
+    doesn't pay a TCP + TLS + AUTH handshake per message. 4xx replies and
+    connections dropped before the message data went out are reported as
+    deferred; a drop after that is a failure, since the server may already
+    have accepted the message.
+    """
+    name = "smtp"
+    batch_size = 20
+    default_rate = None
+
+    def __init__(self, host, port=587, username=None, password=None, sender=None,
+                 starttls=True, pool_size=4, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender or username or "scheduler@localhost"
+        self.starttls = starttls
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password or "")
+        return smtp
+
+    # 🔌 Reuse an idle connection if the server still answers, otherwise open a new one
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            try:
+                smtp = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            try:
+                smtp.noop()
+                return smtp
+            except (smtplib.SMTPException, OSError):
+                self._close(smtp)
+                return self._connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, smtp, healthy):
+        if healthy:
+            self._idle.put(smtp)
+        else:
+            self._close(smtp)
+        self._slots.release()
+
+    @staticmethod
+    def _close(smtp):
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    # 📤 smtplib's sendmail split up, so the caller can tell whether DATA had started
+    def _sendmail(self, smtp, to_email, raw, sending):
+        smtp.ehlo_or_helo_if_needed()
+        code, reply = smtp.mail(self.sender)
+        if code != 250:
+            smtp.rset()
+            raise smtplib.SMTPSenderRefused(code, reply, self.sender)
+        code, reply = smtp.rcpt(to_email)
+        if code not in (250, 251):
+            smtp.rset()
+            raise smtplib.SMTPRecipientsRefused({to_email: (code, reply)})
+        sending["data"] = True
+        code, reply = smtp.data(raw)
+        if code != 250:
+            smtp.rset()
+            raise smtplib.SMTPDataError(code, reply)
+
+    def send(self, messages):
+        try:
+            with external_call("smtp", "connect"):
+                smtp = self._acquire()
+        except (smtplib.SMTPException, OSError) as e:
+            logger.warning("⚠️ SMTP connection failed: %s", e)
+            return [outcome("deferred", error=str(e)) for _ in messages]
+
+        results = []
+        healthy = True
+        try:
+            for message in messages:
+                if not healthy:
+                    results.append(outcome("deferred", error="SMTP connection lost"))
+                    continue
+                sending = {"data": False}
+                try:
+                    mime = build_mime(**message)
+                    mime['From'] = self.sender
+                    mime['Message-ID'] = make_msgid()
+                    with external_call("smtp", "send"):
+                        self._sendmail(smtp, message['to_email'], mime.as_bytes(), sending)
+                    results.append(outcome("sent", mime['Message-ID']))
+                    logger.info("✅ Email sent", extra={"to": message['to_email'], "message_id": mime['Message-ID']})
+                except smtplib.SMTPRecipientsRefused as e:
+                    code = next(iter(e.recipients.values()))[0]
+                    results.append(outcome("deferred" if 400 <= code < 500 else "failed", error=str(e)))
+                except smtplib.SMTPResponseException as e:
+                    results.append(outcome("deferred" if 400 <= e.smtp_code < 500 else "failed", error=str(e)))
+                except (smtplib.SMTPServerDisconnected, OSError) as e:
+                    healthy = False
+                    # Once DATA has started the message may have been delivered; don't send it twice
+                    results.append(outcome("failed" if sending["data"] else "deferred", error=str(e)))
+        finally:
+            self._release(smtp, healthy)
+        return results
+
+
+class SpoolTransport:
+    """
+    Writes every email into a local Maildir instead of sending it, for
+    development and tests.
+    """
+    name = "spool"
+    batch_size = 500
+    default_rate = None
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def send(self, messages):
+        import mailbox
+        box = mailbox.Maildir(self.directory, create=True)
+        results = []
+        for message in messages:
+            try:
+                key = box.add(build_mime(**message))
+                results.append(outcome("sent", key))
+            except OSError as e:
+                results.append(outcome("failed", error=str(e)))
+        return results
+
+
+def make_transport(kind=EMAIL_TRANSPORT):
+    if kind == "gmail":
+        return GmailTransport()
+    if kind == "smtp":
+        return SMTPTransport(
+            host=os.getenv("SMTP_HOST", "localhost"),
+            port=int(os.getenv("SMTP_PORT", "587")),
+            username=os.getenv("SMTP_USERNAME"),
+            password=os.getenv("SMTP_PASSWORD"),
+            sender=os.getenv("SMTP_FROM"),
+            starttls=os.getenv("SMTP_STARTTLS", "1") == "1",
+            pool_size=int(os.getenv("SMTP_POOL_SIZE", "4"))
+        )
+    if kind == "spool":
+        return SpoolTransport(os.getenv("EMAIL_SPOOL_DIR", os.path.join(BASE_DIR, "outbox")))
+    raise ValueError(f"Unknown EMAIL_TRANSPORT: {kind}")
+
+
+class TokenBucket:
+    """
+    Allows `capacity` messages at once, refilled at `rate` per second.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, count=1, timeout=None):
+        """
+        Block until `count` tokens (at most the capacity) are free, then take
+        them and return True. Returns False without waiting when they won't
+        be free within `timeout` seconds.
+        """
+        count = min(count, self.capacity)
+        expires_at = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= count:
+                    self.tokens -= count
+                    return True
+                wait = (count - self.tokens) / self.rate
+            if expires_at is not None and now + wait > expires_at:
+                return False
+            time.sleep(wait)
+
+
+class Outbox:
+    """
+    Process-wide outbound queue in front of a transport. Messages go out in
+    transport-sized chunks paced by a token bucket shared by every request,
+    and the ones the provider defers are sent again with jittered backoff
+    while the caller's deadline allows.
+    """
+
+    def __init__(self, transport, rate=None, burst=EMAIL_BURST, max_attempts=EMAIL_MAX_ATTEMPTS,
+                 retry_delay=EMAIL_RETRY_DELAY):
+        self.transport = transport
+        self.bucket = TokenBucket(rate, max(1, burst)) if rate else None
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def send(self, messages, deadline=EMAIL_SEND_DEADLINE):
+        """
+        Send messages shaped like send_email's arguments. Returns one
+        {"status", "message_id", "error"} dict per message, in order.
+        Pacing and retry waits stop after `deadline` seconds; messages not
+        sent by then are left deferred.
+        """
+        expires_at = time.monotonic() + deadline
+        results = [outcome("failed") for _ in messages]
+        pending = list(range(len(messages)))
+        chunk_size = self.transport.batch_size
+        if self.bucket:
+            chunk_size = min(chunk_size, self.bucket.capacity)
+
+        for attempt in range(1, self.max_attempts + 1):
+            deferred = []
+            for offset in range(0, len(pending), chunk_size):
+                chunk = pending[offset:offset + chunk_size]
+                if self.bucket and not self.bucket.acquire(len(chunk), timeout=expires_at - time.monotonic()):
+                    for index in pending[offset:]:
+                        results[index] = outcome("deferred", error="Send deadline reached")
+                    deferred = []
+                    break
+                for index, result in zip(chunk, self.transport.send([messages[i] for i in chunk])):
+                    results[index] = result
+                    if result["status"] == "deferred":
+                        deferred.append(index)
+
+            delay = random.uniform(0.5, 1) * self.retry_delay * 2 ** (attempt - 1)
+            if not deferred or attempt == self.max_attempts or time.monotonic() + delay >= expires_at:
+                break
+            logger.info("📮 Retrying deferred emails", extra={
+                "transport": self.transport.name, "count": len(deferred), "attempt": attempt, "delay": round(delay, 2)
+            })
+            time.sleep(delay)
+            pending = deferred
+
+        for message, result in zip(messages, results):
+            if result["status"] == "deferred":
+                record_external_error(self.transport.name, "send", "deferred")
+                logger.warning("⚠️ Email still deferred after retries", extra={
+                    "to": message['to_email'], "error": result["error"]
+                })
+        return results
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+def get_outbox():
+    """
+    The shared Outbox for EMAIL_TRANSPORT, built on first use.
+    """
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            transport = make_transport()
+            rate = float(EMAIL_RATE) if EMAIL_RATE is not None else transport.default_rate
+            _outbox = Outbox(transport, rate=rate)
+        return _outbox
@@ -0,0 +1,53 @@
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+logger = logging.getLogger(__name__)
+
+# ⚙️ Concurrency limit and per-recipient timeout, configurable from .env
+MAX_WORKERS = int(os.getenv("EMAIL_CONCURRENCY", "8"))
+RECIPIENT_TIMEOUT = float(os.getenv("EMAIL_TIMEOUT", "30"))
+
+
+# 🚀 Run `task(item)` for every item on a bounded thread pool
+def fan_out(items, task, max_workers=MAX_WORKERS, timeout=RECIPIENT_TIMEOUT):
+    """
+    Run `task` for each item concurrently and collect one result per item, in
+    input order. Each result is a dict with the item, a status of "ok",
+    "failed" or "timeout", the task's return value and any error message.
+    The timeout is counted from when an item's task actually starts running.
+    """
+    results = [{"item": item, "status": "timeout", "value": None, "error": "Timed out"} for item in items]
+    if not items:
+        return results
+
+    started = {}
+
+    def run(index):
+        started[index] = time.monotonic()
+        return task(items[index])
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items))))
+    pending = {executor.submit(run, index): index for index in range(len(items))}
+    try:
+        while pending:
+            done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    results[index].update(status="ok", value=future.result(), error=None)
+                except Exception as e:
+                    results[index].update(status="failed", error=str(e))
+
+            # ⏰ Stop waiting on tasks that have been running longer than the timeout
+            now = time.monotonic()
+            for future, index in list(pending.items()):
+                if index in started and now - started[index] > timeout:
+                    logger.warning("⏰ Task %d of %d timed out after %ss", index + 1, len(items), timeout)
+                    del pending[future]
+    finally:
+        # Hung tasks keep their thread, but we don't block the request on them
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results
@@ -0,0 +1,318 @@
+import bisect
+import logging
+import os
+import re
+from datetime import datetime, time, timedelta
+
+import pytz
+from dateutil.rrule import rrulestr
+
+from slot_engine import merge_slots
+from slot_parser import get_timezone
+
+logger = logging.getLogger(__name__)
+
+# 🕘 Working hours (in each attendee's timezone) that busy time is cut out of
+WORK_START = os.getenv("WORK_START", "09:00")
+WORK_END = os.getenv("WORK_END", "17:00")
+WORK_DAYS = (0, 1, 2, 3, 4)
+
+# 🧾 The only VEVENT properties the extractor keeps; every other line is skipped
+EVENT_FIELDS = {"UID", "DTSTART", "DTEND", "DURATION", "RRULE", "EXDATE", "TRANSP", "STATUS", "RECURRENCE-ID"}
+
+DURATION_PATTERN = re.compile(
+    r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$"
+)
+
+
+# 📜 Yield logical iCalendar lines from a binary stream, joining folded continuation lines
+def unfold_lines(stream):
+    pending = None
+    for raw in stream:
+        line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+        if pending is None:
+            pending = line.lstrip("\ufeff")
+        elif line[:1] in (" ", "\t"):
+            pending += line[1:]
+        else:
+            yield pending
+            pending = line
+    if pending:
+        yield pending
+
+
+# ✂️ Split "NAME;PARAM=x:value" into (name, params, value), ignoring ':' inside quoted params
+def split_property(line):
+    if '"' not in line:
+        head, found, value = line.partition(":")
+        if not found:
+            return None, {}, ""
+        if ";" not in head:
+            return head.upper(), {}, value.strip()
+        return split_params(head, value)
+
+    quoted = False
+    for position, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif char == ":" and not quoted:
+            head, value = line[:position], line[position + 1:]
+            break
+    else:
+        return None, {}, ""
+    return split_params(head, value)
+
+
+def split_params(head, value):
+    name, *raw_params = head.split(";")
+    params = {}
+    for param in raw_params:
+        key, _, param_value = param.partition("=")
+        params[key.upper()] = param_value.strip('"')
+    return name.upper(), params, value.strip()
+
+
+def parse_duration(value):
+    match = DURATION_PATTERN.match(value.strip())
+    if not match:
+        raise ValueError(f"Bad DURATION {value!r}")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    length = timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+                       minutes=int(minutes or 0), seconds=int(seconds or 0))
+    return -length if sign == "-" else length
+
+
+def event_timezone(params, default_tz):
+    tzid = params.get("TZID")
+    if not tzid:
+        return default_tz
+    try:
+        return get_timezone(tzid)
+    except Exception:
+        # Outlook exports Windows zone names pytz doesn't know
+        return default_tz
+
+
+def parse_local(value, params):
+    """
+    Naive local datetime for a DATE or DATE-TIME value, and whether it is a UTC ("Z") time.
+    """
+    value = value.strip()
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return datetime(int(value[:4]), int(value[4:6]), int(value[6:8])), False
+    is_utc = value.endswith("Z")
+    value = value.rstrip("Z")
+    # Sliced by hand: strptime is the slowest step when scanning years of events
+    if len(value) not in (13, 15) or value[8] != "T" or not value.replace("T", "", 1).isdigit():
+        raise ValueError(f"Bad date-time {value!r}")
+    return datetime(
+        int(value[:4]), int(value[4:6]), int(value[6:8]),
+        int(value[9:11]), int(value[11:13]), int(value[13:15] or 0)
+    ), is_utc
+
+
+def to_utc(value, params, default_tz):
+    local, is_utc = parse_local(value, params)
+    if is_utc:
+        return pytz.utc.localize(local)
+    return event_timezone(params, default_tz).localize(local).astimezone(pytz.utc)
+
+
+class BusyIndex:
+    """
+    One calendar's busy time as sorted, merged intervals with parallel start
+    and end lists, so the busy blocks overlapping any range are found by bisect.
+    """
+
+    def __init__(self, intervals):
+        merged = merge_slots(intervals)
+        self.starts = [slot['start'] for slot in merged]
+        self.ends = [slot['end'] for slot in merged]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def free_between(self, start, end):
+        """
+        The parts of [start, end) not covered by a busy interval.
+        """
+        free = []
+        cursor = start
+        # The first busy interval that ends after `start`
+        i = bisect.bisect_right(self.ends, start)
+        while i < len(self.starts) and self.starts[i] < end:
+            if self.starts[i] > cursor:
+                free.append({"start": cursor, "end": self.starts[i]})
+            cursor = max(cursor, self.ends[i])
+            i += 1
+        if cursor < end:
+            free.append({"start": cursor, "end": end})
+        return free
+
+    def free_slots(self, window_start, window_end, timezone, work_start=WORK_START, work_end=WORK_END,
+                   work_days=WORK_DAYS):
+        """
+        Free UTC slots inside working hours on working days in `timezone`,
+        clipped to [window_start, window_end).
+        """
+        tz = get_timezone(timezone)
+        opens, closes = time.fromisoformat(work_start), time.fromisoformat(work_end)
+        free = []
+        day = window_start.astimezone(tz).date()
+        last_day = window_end.astimezone(tz).date()
+        while day <= last_day:
+            if day.weekday() in work_days:
+                start = tz.localize(datetime.combine(day, opens)).astimezone(pytz.utc)
+                end = tz.localize(datetime.combine(day, closes)).astimezone(pytz.utc)
+                start, end = max(start, window_start), min(end, window_end)
+                if start < end:
+                    free.extend(self.free_between(start, end))
+            day += timedelta(days=1)
+        return free
+
+
+class ImportedCalendar:
+    """
+    Result of read_calendar: the busy index plus what the VCALENDAR says
+    about its owner and timezone.
+    """
+
+    def __init__(self, busy, timezone, owner, skipped, errors):
+        self.busy = busy
+        self.timezone = timezone
+        self.owner = owner
+        self.skipped = skipped
+        self.errors = errors
+
+
+def field(event, name):
+    return event[name][2] if name in event else ""
+
+
+def event_intervals(event, window_start, window_end, default_tz, window_days=None):
+    """
+    The event's busy (start, end) UTC pairs overlapping the window. Recurring
+    events are expanded only between the window bounds.
+
+    `window_days` holds YYYYMMDD strings a day either side of the window, so
+    one-off events far outside it are dropped by comparing raw values,
+    before anything is parsed.
+    """
+    _, params, value = event["DTSTART"]
+    if window_days and "RRULE" not in event:
+        if value[:8] > window_days[1] or ("DTEND" in event and event["DTEND"][2][:8] < window_days[0]):
+            return []
+    start = to_utc(value, params, default_tz)
+    if "DTEND" in event:
+        _, end_params, end_value = event["DTEND"]
+        length = to_utc(end_value, end_params, default_tz) - start
+    elif "DURATION" in event:
+        length = parse_duration(event["DURATION"][2])
+    else:
+        all_day = params.get("VALUE") == "DATE" or len(value) == 8
+        length = timedelta(days=1) if all_day else timedelta(0)
+    if length <= timedelta(0):
+        return []
+
+    if "RRULE" not in event:
+        if start >= window_end or start + length <= window_start:
+            return []
+        return [(start, start + length)]
+
+    # 🔁 Expand in local time so every occurrence keeps its wall-clock time across DST
+    tz = pytz.utc if value.endswith("Z") else event_timezone(params, default_tz)
+    local_start, _ = parse_local(value, params)
+    rule = rrulestr(event["RRULE"][2], dtstart=local_start.replace(tzinfo=None), ignoretz=True)
+    exdates = set()
+    for _, ex_params, ex_value in event.get("EXDATE", []):
+        for item in ex_value.split(","):
+            exdates.add(to_utc(item, dict(params, **ex_params), default_tz))
+
+    lower = (window_start - length).astimezone(tz).replace(tzinfo=None)
+    upper = window_end.astimezone(tz).replace(tzinfo=None)
+    intervals = []
+    for occurrence in rule.between(lower, upper, inc=True):
+        occurrence_start = tz.localize(occurrence).astimezone(pytz.utc)
+        if occurrence_start in exdates:
+            continue
+        if occurrence_start < window_end and occurrence_start + length > window_start:
+            intervals.append((occurrence_start, occurrence_start + length))
+    return intervals
+
+
+def read_calendar(stream, window_start, window_end, default_timezone='Asia/Kolkata'):
+    """
+    Stream an exported .ics file and index the busy time inside
+    [window_start, window_end). Only the handful of VEVENT properties needed
+    are kept while an event is open (nested components such as VALARM are
+    skipped), and events outside the window are
+    dropped as soon as they end, so years of history cost a scan, not memory.
+    Transparent (free) and cancelled events don't count as busy.
+    """
+    default_tz = get_timezone(default_timezone)
+    owner = None
+    busy = []
+    recurring = []   # (uid, start, end) occurrences of recurring events
+    replaced = set()  # (uid, original start) instances moved or cancelled by an override
+    skipped = 0
+    errors = []
+    event = None
+    depth = 0  # components open inside the current VEVENT, like VALARM
+    window_days = ((window_start - timedelta(days=1)).strftime("%Y%m%d"),
+                   (window_end + timedelta(days=1)).strftime("%Y%m%d"))
+
+    for line in unfold_lines(stream):
+        name, params, value = split_property(line)
+        if event is None:
+            if name == "BEGIN" and value.upper() == "VEVENT":
+                event = {}
+            elif name == "X-WR-TIMEZONE":
+                try:
+                    default_tz = get_timezone(value)
+                except Exception:
+                    pass
+            elif name == "X-WR-CALNAME" and "@" in value:
+                owner = value
+            continue
+
+        # ⏰ A nested VALARM has its own DURATION/TRIGGER lines; they aren't the event's
+        if name == "BEGIN":
+            depth += 1
+            continue
+        if depth:
+            if name == "END":
+                depth -= 1
+            continue
+
+        if name == "END" and value.upper() == "VEVENT":
+            try:
+                if "DTSTART" not in event:
+                    raise ValueError("VEVENT without DTSTART")
+                uid = field(event, "UID")
+                if "RECURRENCE-ID" in event:
+                    _, rid_params, rid_value = event["RECURRENCE-ID"]
+                    replaced.add((uid, to_utc(rid_value, rid_params, default_tz)))
+                if field(event, "TRANSP").upper() == "TRANSPARENT" or field(event, "STATUS").upper() == "CANCELLED":
+                    skipped += 1
+                else:
+                    intervals = event_intervals(event, window_start, window_end, default_tz, window_days)
+                    if not intervals:
+                        skipped += 1
+                    elif "RRULE" in event:
+                        recurring.extend((uid, start, end) for start, end in intervals)
+                    else:
+                        busy.extend(intervals)
+            except Exception as e:
+                errors.append({"slot": None, "error": f"Skipped an event: {e}"})
+            event = None
+        elif name == "EXDATE":
+            event.setdefault("EXDATE", []).append((name, params, value))
+        elif name in EVENT_FIELDS:
+            event[name] = (name, params, value)
+
+    busy.extend((start, end) for uid, start, end in recurring if (uid, start) not in replaced)
+    logger.info("📅 Calendar imported", extra={"busy": len(busy), "skipped": skipped, "errors": len(errors)})
+    return ImportedCalendar(
+        BusyIndex([{"start": start, "end": end} for start, end in busy]),
+        default_tz.zone, owner, skipped, errors
+    )
@@ -0,0 +1,197 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+logger = logging.getLogger(__name__)
+
+# 📍 Base path to root project directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ⚙️ Job queue settings, configurable from .env
+JOB_STORE = os.getenv("JOB_STORE", "sqlite")
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(BASE_DIR, "jobs.db"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_TTL = int(os.getenv("JOB_TTL", "86400"))
+
+# 🧩 Pipeline stages reported by /jobs/<id>
+JOB_STAGES = ["parse", "rank", "zoom", "emails"]
+
+
+class MemoryJobStore:
+    """
+    Keeps jobs in a dict. Only the worker process that ran a job can report it.
+    """
+
+    def __init__(self, ttl=JOB_TTL):
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id):
+        now = time.time()
+        with self._lock:
+            for old_id in [i for i, job in self._jobs.items() if job["updated_at"] < now - self.ttl]:
+                del self._jobs[old_id]
+            self._jobs[job_id] = {
+                "id": job_id,
+                "status": "queued",
+                "stages": {stage: "pending" for stage in JOB_STAGES},
+                "result": None,
+                "error": None,
+                "created_at": now,
+                "updated_at": now
+            }
+
+    def set_stage(self, job_id, stage, status):
+        with self._lock:
+            job = self._jobs[job_id]
+            job["stages"][stage] = status
+            job["updated_at"] = time.time()
+
+    def finish(self, job_id, status, result=None, error=None):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(status=status, result=result, error=error, updated_at=time.time())
+
+    def set_status(self, job_id, status):
+        with self._lock:
+            self._jobs[job_id].update(status=status, updated_at=time.time())
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return json.loads(json.dumps(job)) if job else None
+
+
+class SQLiteJobStore:
+    """
+    Keeps jobs in a SQLite file so every gunicorn worker can report any job.
+    """
+
+    def __init__(self, path=JOB_DB_PATH, ttl=JOB_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                stages TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+
+    def _execute(self, sql, params=()):
+        with self._lock, closing(sqlite3.connect(self.path, timeout=10)) as conn:
+            with conn:
+                return conn.execute(sql, params).fetchall()
+
+    def create(self, job_id):
+        now = time.time()
+        self._execute("DELETE FROM jobs WHERE updated_at < ?", (now - self.ttl,))
+        stages = json.dumps({stage: "pending" for stage in JOB_STAGES})
+        self._execute(
+            "INSERT INTO jobs (id, status, stages, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?)",
+            (job_id, stages, now, now)
+        )
+
+    def set_stage(self, job_id, stage, status):
+        # The job's own worker thread is the only writer, so read-modify-write is safe
+        job = self.get(job_id)
+        job["stages"][stage] = status
+        self._execute(
+            "UPDATE jobs SET stages = ?, updated_at = ? WHERE id = ?",
+            (json.dumps(job["stages"]), time.time(), job_id)
+        )
+
+    def finish(self, job_id, status, result=None, error=None):
+        self._execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+            (status, result, error, time.time(), job_id)
+        )
+
+    def set_status(self, job_id, status):
+        self._execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+            (status, time.time(), job_id)
+        )
+
+    def get(self, job_id):
+        rows = self._execute(
+            "SELECT id, status, stages, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+            (job_id,)
+        )
+        if not rows:
+            return None
+        job_id, status, stages, result, error, created_at, updated_at = rows[0]
+        return {
+            "id": job_id,
+            "status": status,
+            "stages": json.loads(stages),
+            "result": result,
+            "error": error,
+            "created_at": created_at,
+            "updated_at": updated_at
+        }
+
+
+# 🏭 Pick the job store named by JOB_STORE ("sqlite" or "memory")
+def make_job_store(kind=JOB_STORE):
+    if kind == "memory":
+        return MemoryJobStore()
+    if kind == "sqlite":
+        return SQLiteJobStore()
+    raise ValueError(f"Unknown JOB_STORE: {kind}")
+
+
+class JobQueue:
+    """
+    Runs scheduling pipelines on a background thread pool and records their
+    progress in a job store.
+    """
+
+    def __init__(self, store, max_workers=JOB_WORKERS):
+        self.store = store
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, pipeline, *args):
+        """
+        Queue `pipeline(*args, progress=...)` and return its job id right away.
+        The pipeline reports stages through progress(stage, status) and
+        returns the result HTML.
+        """
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id)
+        with self._lock:
+            # Started on first use so forked gunicorn workers each get their own threads
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            self._executor.submit(self._run, job_id, pipeline, args)
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def _run(self, job_id, pipeline, args):
+        self.store.set_status(job_id, "running")
+
+        def progress(stage, status):
+            self.store.set_stage(job_id, stage, status)
+
+        try:
+            result = pipeline(*args, progress=progress)
+            self.store.finish(job_id, "done", result=result)
+        except Exception as e:
+            logger.exception("❌ Job failed", extra={"job_id": job_id})
+            self.store.finish(job_id, "failed", error=str(e))
@@ -0,0 +1,112 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest
+)
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+# ⏱️ Bucket edges (seconds) covering both in-process stages and slow Gemini calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+STAGE_SECONDS = Histogram(
+    "scheduler_stage_seconds",
+    "Time spent in each stage of the scheduling pipeline",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    "scheduler_request_seconds",
+    "End-to-end HTTP request latency",
+    ["endpoint", "method", "status"],
+    buckets=LATENCY_BUCKETS
+)
+EXTERNAL_CALL_SECONDS = Histogram(
+    "scheduler_external_call_seconds",
+    "Latency of calls to Gemini, Zoom and Gmail",
+    ["service", "operation"],
+    buckets=LATENCY_BUCKETS
+)
+EXTERNAL_CALL_ERRORS = Counter(
+    "scheduler_external_call_errors_total",
+    "Failed calls to Gemini, Zoom and Gmail",
+    ["service", "operation", "reason"]
+)
+
+
+class CacheStatsCollector:
+    """
+    Reports every registered cache's stats() ({"hits", "misses", "size"})
+    as gauges, read when /metrics is scraped.
+    """
+
+    def __init__(self):
+        self.caches = {}
+
+    def collect(self):
+        gauge = GaugeMetricFamily(
+            "scheduler_cache_stats",
+            "Hits, misses and entries of in-process caches (the serving worker's)",
+            labels=["cache", "stat"]
+        )
+        for name, stats in list(self.caches.items()):
+            for stat, value in stats().items():
+                gauge.add_metric([name, stat], value)
+        yield gauge
+
+
+CACHE_STATS = CacheStatsCollector()
+REGISTRY.register(CACHE_STATS)
+
+
+# 🗃️ Export a cache's stats() on /metrics under `name`
+def register_cache(name, stats):
+    CACHE_STATS.caches[name] = stats
+
+
+# 📏 Time one pipeline stage; also usable as a decorator
+@contextmanager
+def stage(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(name).observe(elapsed)
+        logger.debug("Stage finished", extra={"stage": name, "seconds": round(elapsed, 4)})
+
+
+# 🌐 Time one call to an external service and count it as an error if it raises
+@contextmanager
+def external_call(service, operation):
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        record_external_error(service, operation, type(e).__name__)
+        raise
+    finally:
+        EXTERNAL_CALL_SECONDS.labels(service, operation).observe(time.perf_counter() - started)
+
+
+# ❗ Count a failed external call that didn't raise (bad status code, unusable reply)
+def record_external_error(service, operation, reason):
+    EXTERNAL_CALL_ERRORS.labels(service, operation, reason).inc()
+
+
+def render_metrics():
+    """
+    Return (body, content_type) in the Prometheus text format. Under gunicorn
+    with PROMETHEUS_MULTIPROC_DIR set, every worker's samples are combined.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(CACHE_STATS)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
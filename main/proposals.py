@@ -0,0 +1,171 @@
+import os
+import pickle
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+
+from jobs import JOB_DB_PATH, JOB_STORE
+
+# ⚙️ Proposals share the job queue's store unless PROPOSAL_STORE says otherwise
+PROPOSAL_STORE = os.getenv("PROPOSAL_STORE", JOB_STORE)
+
+
+class MemoryProposalStore:
+    """
+    Bounded LRU + TTL store of meeting proposals awaiting confirmation: the
+    parsed agents, their availability index and the ranked slot, keyed by an
+    unguessable token that also serves as the meeting id. Only the worker
+    process that made a proposal can confirm or edit it.
+    """
+
+    def __init__(self, max_size=256, ttl_seconds=900):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # token -> (expires_at, proposal)
+        self._lock = threading.Lock()
+
+    def add(self, proposal):
+        token = secrets.token_urlsafe(16)
+        with self._lock:
+            self._entries[token] = (time.monotonic() + self.ttl_seconds, proposal)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return token
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if not entry:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[token]
+                return None
+            # Each use keeps the proposal alive for another TTL
+            self._entries[token] = (time.monotonic() + self.ttl_seconds, entry[1])
+            self._entries.move_to_end(token)
+            return entry[1]
+
+    @contextmanager
+    def edit(self, token):
+        """
+        Yield a live proposal (or None) to change in place.
+        """
+        yield self.get(token)
+
+    def pop(self, token):
+        """
+        Remove and return a live proposal, so confirming twice can't send the
+        invites twice.
+        """
+        with self._lock:
+            entry = self._entries.pop(token, None)
+            if not entry or entry[0] <= time.monotonic():
+                return None
+            return entry[1]
+
+
+class SQLiteProposalStore:
+    """
+    Keeps pickled proposals in the job queue's SQLite file so any gunicorn
+    worker can confirm or edit a proposal another worker made.
+    """
+
+    def __init__(self, path=JOB_DB_PATH, max_size=256, ttl_seconds=900):
+        self.path = path
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS proposals (
+                    token TEXT PRIMARY KEY,
+                    proposal BLOB NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        # isolation_level=None lets edit() and pop() take the write lock with BEGIN IMMEDIATE
+        return closing(sqlite3.connect(self.path, timeout=10, isolation_level=None))
+
+    def add(self, proposal):
+        token = secrets.token_urlsafe(16)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM proposals WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "INSERT INTO proposals (token, proposal, expires_at) VALUES (?, ?, ?)",
+                (token, pickle.dumps(proposal), now + self.ttl_seconds)
+            )
+            # Drop the proposals closest to expiry past max_size
+            conn.execute(
+                "DELETE FROM proposals WHERE token NOT IN "
+                "(SELECT token FROM proposals ORDER BY expires_at DESC LIMIT ?)",
+                (self.max_size,)
+            )
+            conn.execute("COMMIT")
+        return token
+
+    @staticmethod
+    def _load(conn, token):
+        rows = conn.execute(
+            "SELECT proposal FROM proposals WHERE token = ? AND expires_at > ?", (token, time.time())
+        ).fetchall()
+        return pickle.loads(rows[0][0]) if rows else None
+
+    def get(self, token):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            proposal = self._load(conn, token)
+            # Each use keeps the proposal alive for another TTL
+            conn.execute(
+                "UPDATE proposals SET expires_at = ? WHERE token = ?", (time.time() + self.ttl_seconds, token)
+            )
+            conn.execute("COMMIT")
+        return proposal
+
+    @contextmanager
+    def edit(self, token):
+        """
+        Yield a live proposal (or None) and store it back, with a fresh TTL,
+        when the block exits. Other workers' edits wait until then, so
+        concurrent attendee updates can't overwrite each other.
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                proposal = self._load(conn, token)
+                yield proposal
+                if proposal is not None:
+                    conn.execute(
+                        "UPDATE proposals SET proposal = ?, expires_at = ? WHERE token = ?",
+                        (pickle.dumps(proposal), time.time() + self.ttl_seconds, token)
+                    )
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def pop(self, token):
+        """
+        Remove and return a live proposal, so confirming twice, even on two
+        workers, can't send the invites twice.
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            proposal = self._load(conn, token)
+            conn.execute("DELETE FROM proposals WHERE token = ?", (token,))
+            conn.execute("COMMIT")
+        return proposal
+
+
+# 🏭 Pick the proposal store named by PROPOSAL_STORE ("sqlite" or "memory")
+def make_proposal_store(kind=PROPOSAL_STORE, ttl_seconds=900):
+    if kind == "memory":
+        return MemoryProposalStore(ttl_seconds=ttl_seconds)
+    if kind == "sqlite":
+        return SQLiteProposalStore(ttl_seconds=ttl_seconds)
+    raise ValueError(f"Unknown PROPOSAL_STORE: {kind}")
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+# 🔑 Build a stable cache key from a slot list and the attendees' timezones
+# (order, duplicates and whitespace don't matter)
+def slot_set_key(slots, timezones=()):
+    canonical = sorted(f"{slot['start'].strip()}|{slot['end'].strip()}" for slot in slots)
+    canonical += sorted(f"tz|{tz}" for tz in set(timezones))
+    return hashlib.sha256("\n".join(canonical).encode("utf-8")).hexdigest()
+
+
+class RankingCache(TTLCache):
+    """
+    LRU + TTL cache of Gemini slot rankings (the full best-first slot list),
+    optionally persisted to a JSON-lines journal so the rankings survive
+    gunicorn worker restarts and are shared between workers.
+    """
+
+    def __init__(self, max_size=256, ttl_seconds=3600, path=None):
+        super().__init__(max_size, ttl_seconds)
+        self.path = path
+        self._appended = 0
+        # Serialises this process's file writes; cache reads never wait on disk
+        self._file_lock = threading.Lock()
+        self._load()
+
+    def get(self, slots, timezones=()):
+        return self.lookup(slot_set_key(slots, timezones))
+
+    def put(self, slots, ranking, timezones=()):
+        key = slot_set_key(slots, timezones)
+        expires_at = self.store(key, ranking)
+        self._append(key, expires_at, ranking)
+
+    # 📖 Read every unexpired entry from the journal, the newest write winning
+    def _read_journal(self):
+        stored = OrderedDict()
+        if not self.path or not os.path.exists(self.path):
+            return stored
+        now = time.time()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        key, expires_at, ranking = entry
+                    except ValueError:
+                        # A line another worker was still writing, or a file from before the journal
+                        continue
+                    # Files written before whole rankings were cached hold a single slot
+                    if (isinstance(key, str) and isinstance(expires_at, (int, float))
+                            and expires_at > now and isinstance(ranking, list)):
+                        stored.pop(key, None)
+                        stored[key] = (expires_at, ranking)
+        except OSError as e:
+            logger.warning("⚠️ Could not load ranking cache: %s", e)
+        return stored
+
+    # 📂 Load unexpired rankings from disk, if persistence is enabled
+    def _load(self):
+        for key, (expires_at, ranking) in self._read_journal().items():
+            self._insert(key, expires_at, ranking)
+
+    # 💾 Append one entry to the journal, compacting it once it has grown past max_size lines
+    def _append(self, key, expires_at, ranking):
+        if not self.path:
+            return
+        line = json.dumps([key, expires_at, ranking]) + "\n"
+        with self._file_lock:
+            try:
+                # A single O_APPEND write, so lines from several workers don't interleave
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except OSError as e:
+                logger.warning("⚠️ Could not save ranking cache: %s", e)
+                return
+            self._appended += 1
+            if self._appended > self.max_size:
+                self._compact()
+
+    # 🗜️ Rewrite the journal as the merge of what's on disk and in memory, atomically
+    def _compact(self):
+        # Callers hold _file_lock
+        merged = self._read_journal()
+        with self._lock:
+            snapshot = list(self._entries.items())
+        for key, entry in snapshot:
+            if key not in merged or merged[key][0] < entry[0]:
+                merged.pop(key, None)
+                merged[key] = entry
+        kept = list(merged.items())[-self.max_size:]
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps([key, expires, ranking]) + "\n" for key, (expires, ranking) in kept)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("⚠️ Could not compact ranking cache: %s", e)
+            return
+        self._appended = 0
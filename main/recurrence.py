@@ -0,0 +1,183 @@
+import heapq
+import os
+from datetime import date, datetime, time, timedelta
+
+import pytz
+
+from slot_engine import merge_slots, merge_sorted_stream
+from slot_parser import get_timezone, parse_timestamp
+
+# 🔭 Days ahead searched for users with recurring availability when nobody
+# else's slots bound the search
+RECURRENCE_HORIZON_DAYS = int(os.getenv("RECURRENCE_HORIZON_DAYS", "28"))
+
+WEEKDAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+
+
+class WeeklyRule:
+    """
+    A recurring availability window in the user's timezone, like the RRULE
+    FREQ=WEEKLY;BYDAY=MO,WE;INTERVAL=1;UNTIL=20251231 with a daily start and
+    end time. Dates in `exdates` are skipped, and an end time at or before the
+    start time runs into the next day.
+    """
+
+    def __init__(self, days, start, end, timezone, interval=1, dtstart=None, until=None, exdates=()):
+        self.days = frozenset(days)
+        self.start = start
+        self.end = end
+        self.tz = get_timezone(timezone)
+        self.interval = interval
+        self.dtstart = dtstart
+        self.until = until
+        self.exdates = frozenset(exdates)
+        self.length_days = 1 if end <= start else 0
+        # Weeks are counted from the Monday of dtstart for INTERVAL > 1, which needs a dtstart
+        if interval > 1 and not dtstart:
+            raise ValueError("INTERVAL above 1 needs a DTSTART")
+        self.anchor = dtstart - timedelta(days=dtstart.weekday()) if dtstart else None
+
+    def _occurs_on(self, day):
+        if day.weekday() not in self.days or day in self.exdates:
+            return False
+        if (self.dtstart and day < self.dtstart) or (self.until and day > self.until):
+            return False
+        return self.interval == 1 or ((day - self.anchor).days // 7) % self.interval == 0
+
+    def occurrences(self, window_start, window_end):
+        """
+        Yield this rule's {"start", "end"} UTC windows overlapping
+        [window_start, window_end) in order, clipped to the range. Nothing is
+        generated beyond what the caller reads.
+        """
+        day = window_start.astimezone(self.tz).date() - timedelta(days=self.length_days)
+        last_day = window_end.astimezone(self.tz).date()
+        if self.dtstart and day < self.dtstart:
+            day = self.dtstart
+        if self.until and last_day > self.until:
+            last_day = self.until
+
+        while day <= last_day:
+            if self._occurs_on(day):
+                # localize per day so each occurrence gets that day's DST offset
+                start = self.tz.localize(datetime.combine(day, self.start)).astimezone(pytz.utc)
+                end_day = day + timedelta(days=self.length_days)
+                end = self.tz.localize(datetime.combine(end_day, self.end)).astimezone(pytz.utc)
+                start, end = max(start, window_start), min(end, window_end)
+                if start < end:
+                    yield {"start": start, "end": end}
+            day += timedelta(days=1)
+
+
+def parse_day(value):
+    value = str(value).strip()
+    if len(value) == 8 and value.isdigit():
+        return date(int(value[:4]), int(value[4:6]), int(value[6:]))
+    return parse_timestamp(value).date()
+
+
+def parse_rrule(text):
+    """
+    Split an RRULE string ("FREQ=WEEKLY;BYDAY=MO,TU;UNTIL=20251231") into
+    upper-cased field names and their values.
+    """
+    fields = {}
+    for part in text.upper().removeprefix("RRULE:").split(";"):
+        if part.strip():
+            name, _, value = part.partition("=")
+            fields[name.strip()] = value.strip()
+    return fields
+
+
+def build_rule(raw, timezone_str):
+    fields = {key.upper(): value for key, value in raw.items() if key != "rrule"}
+    if raw.get("rrule"):
+        fields = dict(parse_rrule(raw["rrule"]), **fields)
+
+    freq = str(fields.get("FREQ", "WEEKLY")).upper()
+    if freq not in ("WEEKLY", "DAILY"):
+        raise ValueError(f"Unsupported FREQ {freq!r}, use WEEKLY or DAILY")
+
+    byday = fields.get("BYDAY")
+    if isinstance(byday, str):
+        byday = byday.split(",")
+    if not byday:
+        if freq == "WEEKLY":
+            raise ValueError("Weekly rules need BYDAY")
+        byday = list(WEEKDAYS)
+    try:
+        days = [WEEKDAYS[day.strip().upper()] for day in byday]
+    except KeyError as e:
+        raise ValueError(f"Unknown weekday {e.args[0]!r}")
+
+    if "START" not in fields or "END" not in fields:
+        raise ValueError("Rules need a start and end time")
+    interval = int(fields.get("INTERVAL", 1))
+    if interval < 1:
+        raise ValueError("INTERVAL must be at least 1")
+
+    exdates = fields.get("EXDATE") or []
+    if isinstance(exdates, str):
+        exdates = exdates.split(",")
+
+    return WeeklyRule(
+        days,
+        time.fromisoformat(str(fields["START"]).strip()),
+        time.fromisoformat(str(fields["END"]).strip()),
+        timezone_str,
+        interval=interval,
+        dtstart=parse_day(fields["DTSTART"]) if fields.get("DTSTART") else None,
+        until=parse_day(fields["UNTIL"]) if fields.get("UNTIL") else None,
+        exdates=[parse_day(value) for value in exdates]
+    )
+
+
+def parse_rules(rules, timezone_str='Asia/Kolkata'):
+    """
+    Turn a user's "recurrence" entries into WeeklyRules. Each entry holds a
+    daily "start"/"end" time and either an "rrule" string or the same fields
+    as keys ("byday", "interval", "dtstart", "until", "exdate").
+    Returns (rules, errors) like parse_slots.
+    """
+    try:
+        get_timezone(timezone_str)
+    except Exception as e:
+        return [], [{"slot": None, "error": f"Unknown timezone {timezone_str!r}: {e}"}]
+
+    parsed = []
+    errors = []
+    for raw in rules:
+        if not raw:
+            continue
+        try:
+            parsed.append(build_rule(raw, timezone_str))
+        except Exception as e:
+            errors.append({"slot": raw, "error": str(e)})
+    return parsed, errors
+
+
+def default_window(days=RECURRENCE_HORIZON_DAYS):
+    start = datetime.now(pytz.utc).replace(second=0, microsecond=0)
+    return start, start + timedelta(days=days)
+
+
+def availability_stream(slots, rules, window_start, window_end):
+    """
+    One user's free time in [window_start, window_end): their one-off slots
+    plus every rule occurrence, merged into a lazy start-sorted stream.
+    """
+    explicit = []
+    for slot in merge_slots(slots):
+        start, end = max(slot['start'], window_start), min(slot['end'], window_end)
+        if start < end:
+            explicit.append({"start": start, "end": end})
+    streams = [explicit] + [rule.occurrences(window_start, window_end) for rule in rules]
+    return merge_sorted_stream(heapq.merge(*streams, key=lambda slot: slot['start']))
+
+
+def expand_slots(slots, rules, start, end):
+    """
+    A user's one-off slots plus their rule occurrences in [start, end), for
+    where a plain list is needed (the reschedule fallback).
+    """
+    return merge_slots(list(slots) + [slot for rule in rules for slot in rule.occurrences(start, end)])
@@ -0,0 +1,160 @@
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from metrics import external_call, record_external_error
+
+logger = logging.getLogger(__name__)
+
+# ⚡ Consecutive failures that open a provider's circuit, and how long it stays open
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+
+# 🔁 Retry backoff: random delay up to base * 2^attempt, capped ("full jitter")
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 4.0
+
+# 🧵 Threads that run external calls so a hung one can be abandoned at its deadline
+CALL_WORKERS = int(os.getenv("EXTERNAL_CALL_WORKERS", "32"))
+
+
+class CircuitOpenError(RuntimeError):
+    """The provider failed repeatedly, so calls fail fast until it cools down."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """The call didn't finish within its deadline."""
+
+
+class TransientError(RuntimeError):
+    """
+    Raised by a wrapped call for failures worth retrying, such as HTTP 429/5xx.
+    `retry_after` (seconds) is honoured when the provider sends one.
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Closed until `failure_threshold` calls in a row fail, then open: calls are
+    refused for `reset_timeout` seconds. After that one trial call is let
+    through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return "open"
+            return "half_open"
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.trial_running or time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info("✅ Circuit closed", extra={"service": self.name})
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            trial_failed = self.trial_running
+            self.trial_running = False
+            if trial_failed or (self.opened_at is None and self.failures >= self.failure_threshold):
+                logger.warning("⚡ Circuit opened", extra={"service": self.name, "failures": self.failures})
+                self.opened_at = time.monotonic()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(service):
+    with _breakers_lock:
+        if service not in _breakers:
+            _breakers[service] = CircuitBreaker(service)
+        return _breakers[service]
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=CALL_WORKERS, thread_name_prefix="external-call")
+        return _executor
+
+
+def backoff_delay(attempt):
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def call_external(service, operation, func, *args, deadline, retries=0, retry_on=(TransientError, OSError), **kwargs):
+    """
+    Call func(*args, **kwargs) for an external service, giving up after
+    `deadline` seconds in total (retries included) even if the call hangs.
+
+    Exceptions in `retry_on` are retried up to `retries` times with jittered
+    backoff while time remains. Every failure counts against the service's
+    circuit breaker; while it is open this raises CircuitOpenError at once so
+    callers drop straight to their fallback.
+    """
+    breaker = get_breaker(service)
+    expires_at = time.monotonic() + deadline
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            record_external_error(service, operation, "circuit_open")
+            raise CircuitOpenError(f"{service} is unavailable (circuit open)")
+
+        try:
+            with external_call(service, operation):
+                future = get_executor().submit(func, *args, **kwargs)
+                try:
+                    result = future.result(timeout=max(0, expires_at - time.monotonic()))
+                except FutureTimeout:
+                    # The worker thread is left to finish on its own; we stop waiting for it
+                    future.cancel()
+                    raise DeadlineExceeded(f"{service} {operation} took longer than {deadline}s")
+        except Exception as e:
+            breaker.record_failure()
+            delay = max(backoff_delay(attempt), getattr(e, "retry_after", None) or 0)
+            if attempt >= retries or not isinstance(e, retry_on) or time.monotonic() + delay >= expires_at:
+                raise
+            attempt += 1
+            logger.info("🔁 Retrying external call", extra={
+                "service": service, "operation": operation, "attempt": attempt, "error": str(e)
+            })
+            time.sleep(delay)
+            continue
+
+        breaker.record_success()
+        return result
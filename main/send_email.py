@@ -1,15 +1,16 @@
 import os
 import base64
+import logging
+import threading
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email import encoders
 
+from metrics import external_call, record_external_error
+from resilience import call_external, CircuitOpenError
 
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
+logger = logging.getLogger(__name__)
 
 # ✅ Scope required to send emails using Gmail API
 SCOPES = ['https://www.googleapis.com/auth/gmail.send']
@@ -21,75 +22,195 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CREDENTIALS_PATH = os.path.join(BASE_DIR, 'credentials', 'credentials.json')
 TOKEN_PATH = os.path.join(BASE_DIR, 'credentials', 'token.json')
 
+# 📦 Gmail's batch endpoint accepts up to 100 calls, but 50 avoids rate-limit errors
+BATCH_SIZE = 50
+
+# ⏳ Hard limit (seconds) per Gmail send or batch. Sends aren't retried: a send
+# that timed out may still have gone through, and a retry would duplicate it
+GMAIL_TIMEOUT = float(os.getenv("GMAIL_TIMEOUT", "30"))
+
+# ♻️ Process-wide credentials and Gmail client, built once and shared by every thread
+_creds = None
+_service = None
+_lock = threading.Lock()
+_local = threading.local()
+
+def get_credentials():
+    """
+    Return cached OAuth credentials, loading them from disk on first use and
+    refreshing them only when they have expired.
+    """
+    global _creds
+
+    # 💤 The Google client libraries are imported on first use, not at startup
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from google.auth.transport.requests import Request
+
+    with _lock:
+        # 🔐 Load saved credentials if available
+        if _creds is None and os.path.exists(TOKEN_PATH):
+            _creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
+
+        # 🔄 Refresh or create new credentials if needed
+        if not _creds or not _creds.valid:
+            if _creds and _creds.expired and _creds.refresh_token:
+                _creds.refresh(Request())
+            else:
+                # 💻 Run local server to authenticate with Google account
+                flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_PATH, SCOPES)
+                _creds = flow.run_local_server(port=0)
+
+            # 💾 Save the new token for next time
+            with open(TOKEN_PATH, 'w') as token:
+                token.write(_creds.to_json())
+
+        return _creds
+
 def get_service():
     """
     Authenticate and return the Gmail API service.
-    It checks for saved token or creates a new one if needed.
+    The discovery document is only built once per process.
     """
-    creds = None
+    global _service
+    from googleapiclient.discovery import build
 
-    # 🔐 Load saved credentials if available
-    if os.path.exists(TOKEN_PATH):
-        creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
+    creds = get_credentials()
+    with _lock:
+        if _service is None:
+            # 📧 Build Gmail API client
+            _service = build('gmail', 'v1', credentials=creds, cache_discovery=False)
+        return _service
 
-    # 🔄 Refresh or create new credentials if needed
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            # 💻 Run local server to authenticate with Google account
-            flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_PATH, SCOPES)
-            creds = flow.run_local_server(port=0)
-        
-        # 💾 Save the new token for next time
-        with open(TOKEN_PATH, 'w') as token:
-            token.write(creds.to_json())
-
-    # 📧 Return Gmail API client
-    return build('gmail', 'v1', credentials=creds)
-
-def send_email(to_email, subject, body_text, ics_path=None):
+def get_http():
     """
-    Send an email using Gmail API with optional .ics calendar invite attached.
+    Return this thread's authorized HTTP transport. httplib2 connections are
+    not thread-safe, so each thread gets its own while sharing the service.
     """
-    try:
-        # ✅ Get authenticated Gmail API service
-        service = get_service()
-
-        # 📨 Create email container with mixed content (text + file)
-        message = MIMEMultipart('mixed')
-        message['To'] = to_email
-        message['Subject'] = subject
-
-        # 📄 Add plain text message to email
-        message.attach(MIMEText(body_text, 'plain'))
-
-        # 📅 If there's a .ics file, add it as inline and as attachment
-        if ics_path and os.path.exists(ics_path):
-            # 🔁 Read the .ics content
-            with open(ics_path, 'r', encoding='utf-8') as f:
-                ics_data = f.read()
-
-            # 🧷 Inline calendar (so Google Calendar/Outlook detects it)
-            calendar_part = MIMEText(ics_data, 'calendar', _charset='utf-8')
-            calendar_part.add_header('Content-Type', 'text/calendar; method=REQUEST; charset=UTF-8')
-            calendar_part.add_header('Content-Disposition', 'inline; filename="meeting.ics"')
-            message.attach(calendar_part)
-
-            # 📎 Attach .ics as downloadable file too
-            with open(ics_path, 'rb') as f:
-                attachment = MIMEBase('application', 'octet-stream')
-                attachment.set_payload(f.read())
-                encoders.encode_base64(attachment)
-                attachment.add_header('Content-Disposition', 'attachment; filename="meeting.ics"')
-                message.attach(attachment)
-
-        # 🚀 Encode and send the final email
-        raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
-        send_body = {'raw': raw}
-        result = service.users().messages().send(userId='me', body=send_body).execute()
-
-        print(f"✅ Email sent to {to_email} — Message ID: {result['id']}")
+    from google_auth_httplib2 import AuthorizedHttp
+    import httplib2
+
+    creds = get_credentials()
+    if getattr(_local, 'http', None) is None:
+        _local.http = AuthorizedHttp(creds, http=httplib2.Http(timeout=GMAIL_TIMEOUT))
+    return _local.http
 
+def build_mime(to_email, subject, body_text, ics_data=None):
+    """
+    Build the MIME email with an optional .ics invite.
+    `ics_data` is the calendar text from calendar_invite.generate_ics.
+    """
+    # 📨 Create email container with mixed content (text + file)
+    message = MIMEMultipart('mixed')
+    message['To'] = to_email
+    message['Subject'] = subject
+
+    # 📄 Add plain text message to email
+    message.attach(MIMEText(body_text, 'plain'))
+
+    # 📅 If there's an invite, add it as inline and as attachment
+    if ics_data:
+        # 🧷 Inline calendar (so Google Calendar/Outlook detects it)
+        calendar_part = MIMEText(ics_data, 'calendar', _charset='utf-8')
+        calendar_part.add_header('Content-Type', 'text/calendar; method=REQUEST; charset=UTF-8')
+        calendar_part.add_header('Content-Disposition', 'inline; filename="meeting.ics"')
+        message.attach(calendar_part)
+
+        # 📎 Attach .ics as downloadable file too
+        attachment = MIMEBase('application', 'octet-stream')
+        attachment.set_payload(ics_data.encode('utf-8'))
+        encoders.encode_base64(attachment)
+        attachment.add_header('Content-Disposition', 'attachment; filename="meeting.ics"')
+        message.attach(attachment)
+
+    return message
+
+def build_message(to_email, subject, body_text, ics_data=None):
+    """
+    Build the raw Gmail API payload for one email with an optional .ics invite.
+    """
+    # 🚀 Encode the final email
+    message = build_mime(to_email, subject, body_text, ics_data)
+    raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
+    return {'raw': raw}
+
+# 🚦 Statuses Gmail uses for "try again later": rate limits and server errors
+DEFERRED_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")
+
+def is_deferred(exception):
+    """
+    True when Gmail turned a message away only for now (quota or outage),
+    so it's safe to send it again later.
+    """
+    resp = getattr(exception, 'resp', None)
+    status = getattr(resp, 'status', None)
+    if status in DEFERRED_STATUSES:
+        return True
+    return status == 403 and any(reason in str(exception) for reason in RATE_LIMIT_REASONS)
+
+def send_batch_outcomes(messages):
+    """
+    Send many emails through Gmail's HTTP batch endpoint. `messages` is a
+    list of dicts with build_message's arguments. Returns a {"status",
+    "message_id", "error"} dict per message, in order. Status is "sent",
+    "failed", or "deferred" when Gmail asked us to slow down or was briefly
+    unavailable, so the message can be sent again.
+    """
+    results = [{"status": "failed", "message_id": None, "error": None} for _ in messages]
+    if not messages:
+        return results
+
+    try:
+        with external_call("gmail", "auth"):
+            service = get_service()
     except Exception as e:
-        print(f"⚠️ Failed to send email to {to_email}: {e}")
+        logger.error("⚠️ Failed to get Gmail service for batch send: %s", e)
+        for outcome in results:
+            outcome["error"] = str(e)
+        return results
+
+    def on_sent(request_id, response, exception):
+        index = int(request_id)
+        to_email = messages[index]['to_email']
+        if exception is not None:
+            record_external_error("gmail", "send", type(exception).__name__)
+            logger.warning("⚠️ Failed to send email to %s: %s", to_email, exception)
+            results[index] = {
+                "status": "deferred" if is_deferred(exception) else "failed",
+                "message_id": None,
+                "error": str(exception)
+            }
+        else:
+            results[index] = {"status": "sent", "message_id": response['id'], "error": None}
+            logger.info("✅ Email sent", extra={"to": to_email, "message_id": response['id']})
+
+    # 📦 One HTTP round-trip per chunk instead of one per recipient
+    for offset in range(0, len(messages), BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=on_sent)
+        for index in range(offset, min(offset + BATCH_SIZE, len(messages))):
+            try:
+                send_body = build_message(**messages[index])
+            except Exception as e:
+                logger.warning("⚠️ Failed to build email to %s: %s", messages[index]['to_email'], e)
+                results[index]["error"] = str(e)
+                continue
+            batch.add(
+                service.users().messages().send(userId='me', body=send_body),
+                request_id=str(index)
+            )
+        try:
+            call_external("gmail", "send_batch", lambda batch=batch: batch.execute(http=get_http()), deadline=GMAIL_TIMEOUT)
+        except CircuitOpenError as e:
+            # Nothing left the process, so these can safely go out later
+            logger.warning("⚠️ Batch send deferred: %s", e)
+            for index in range(offset, min(offset + BATCH_SIZE, len(messages))):
+                results[index] = {"status": "deferred", "message_id": None, "error": str(e)}
+        except Exception as e:
+            logger.error("⚠️ Batch send failed: %s", e)
+            for index in range(offset, min(offset + BATCH_SIZE, len(messages))):
+                if results[index]["status"] == "failed" and not results[index]["error"]:
+                    results[index]["error"] = str(e)
+
+    # A batch abandoned at its deadline may still call on_sent later; hand back a snapshot
+    return [dict(outcome) for outcome in results]
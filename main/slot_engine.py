@@ -0,0 +1,168 @@
+import heapq
+import itertools
+import math
+from datetime import timedelta
+
+# Event kinds used by the sweep. Ends sort before starts at the same instant,
+# so back-to-back slots (10:00-11:00, 11:00-12:00) never count as overlapping.
+SLOT_END = 0
+SLOT_START = 1
+# Marks the end of one user's stream in the lazy sweep
+STREAM_DONE = 2
+
+
+# 🧹 Drop empty/None slots, sort by start time and merge overlapping and
+# back-to-back ones (10-10:30 + 10:30-11 -> 10-11), so a slot split at an
+# arbitrary boundary still counts as one long enough for the meeting
+def merge_slots(slots):
+    ordered = sorted((slot for slot in slots if slot), key=lambda slot: slot['start'])
+    merged = []
+    for slot in ordered:
+        if slot['start'] >= slot['end']:
+            continue
+        if merged and slot['start'] <= merged[-1]['end']:
+            if slot['end'] > merged[-1]['end']:
+                merged[-1]['end'] = slot['end']
+        else:
+            merged.append({"start": slot['start'], "end": slot['end']})
+    return merged
+
+
+# ⏱️ Turn one user's merged slots into a sorted stream of (time, kind) events
+def slot_events(merged_slots):
+    for slot in merged_slots:
+        yield (slot['start'], SLOT_START)
+        yield (slot['end'], SLOT_END)
+
+
+# ✂️ Drop slots too short to hold a meeting of `min_length`
+def drop_short_slots(slots, min_length):
+    if not min_length:
+        return slots
+    return [slot for slot in slots if slot['end'] - slot['start'] >= min_length]
+
+
+# 🔀 Sweep across every user's slots at once and keep the ranges where all users are free
+def intersect_slots(calendars, min_length=None):
+    """
+    Find the time ranges shared by every calendar.
+
+    Each calendar is a list of {"start", "end"} dicts whose values are comparable
+    (datetimes or zero-padded time strings). None entries are ignored. The result
+    is a sorted list of {"start", "end"} dicts.
+
+    With `min_length` (a timedelta), each user's slots that are still too short
+    after back-to-back ones are joined are dropped before the sweep, and so are
+    too-short overlaps.
+    """
+    merged = [drop_short_slots(merge_slots(slots), min_length) for slots in calendars]
+    if not merged or not all(merged):
+        return []
+
+    total = len(merged)
+    active = 0
+    opened_at = None
+    common = []
+
+    # 🧮 k-way merge of the per-user event streams keeps this O(N log k)
+    for time, kind in heapq.merge(*(slot_events(slots) for slots in merged)):
+        if kind == SLOT_START:
+            active += 1
+            if active == total:
+                opened_at = time
+        else:
+            if active == total and opened_at < time:
+                if common and common[-1]['end'] == opened_at:
+                    common[-1]['end'] = time
+                else:
+                    common.append({"start": opened_at, "end": time})
+            active -= 1
+
+    return drop_short_slots(common, min_length)
+
+
+# 🌊 Lazily merge a start-sorted stream of slots, joining overlapping and back-to-back ones
+def merge_sorted_stream(slots):
+    current = None
+    for slot in slots:
+        if slot['start'] >= slot['end']:
+            continue
+        if current and slot['start'] <= current['end']:
+            if slot['end'] > current['end']:
+                current['end'] = slot['end']
+        else:
+            if current:
+                yield current
+            current = {"start": slot['start'], "end": slot['end']}
+    if current:
+        yield current
+
+
+# ⏱️ Like slot_events, plus a STREAM_DONE marker after the user's last slot
+def stream_events(slots):
+    last_end = None
+    for slot in slots:
+        yield (slot['start'], SLOT_START)
+        yield (slot['end'], SLOT_END)
+        last_end = slot['end']
+    if last_end is not None:
+        yield (last_end, STREAM_DONE)
+
+
+def iter_intersect_slots(streams, min_length=None):
+    """
+    Generator version of intersect_slots for start-sorted slot streams, such as
+    recurrence occurrences. Slots are pulled from each stream only as far as
+    the caller reads the common slots, and the sweep stops as soon as any
+    stream runs out.
+    """
+    merged = []
+    for stream in streams:
+        slots = merge_sorted_stream(stream)
+        if min_length:
+            slots = (slot for slot in slots if slot['end'] - slot['start'] >= min_length)
+        first = next(slots, None)
+        if first is None:
+            return
+        merged.append(itertools.chain([first], slots))
+    if not merged:
+        return
+
+    total = len(merged)
+    active = 0
+    opened_at = None
+    for time, kind in heapq.merge(*(stream_events(slots) for slots in merged)):
+        if kind == SLOT_START:
+            active += 1
+            if active == total:
+                opened_at = time
+        elif kind == SLOT_END:
+            if active == total and opened_at < time and (not min_length or time - opened_at >= min_length):
+                yield {"start": opened_at, "end": time}
+            active -= 1
+        else:
+            return
+
+
+# 📐 Round a datetime up to the next multiple of `granularity` (counted from midnight)
+def align_up(moment, granularity):
+    midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    steps = math.ceil((moment - midnight) / granularity)
+    return midnight + steps * granularity
+
+
+def candidate_starts(slots, duration, buffer=timedelta(0), granularity=timedelta(minutes=15), limit=None):
+    """
+    Expand common slots into concrete meetings of `duration`, starting on the
+    `granularity` grid and leaving `buffer` free before and after. Returns a
+    list of {"start", "end"} dicts holding the meeting times, at most `limit`.
+    """
+    candidates = []
+    for slot in slots:
+        start = align_up(slot['start'] + buffer, granularity)
+        while start + duration + buffer <= slot['end']:
+            candidates.append({"start": start, "end": start + duration})
+            if limit and len(candidates) >= limit:
+                return candidates
+            start += granularity
+    return candidates
@@ -0,0 +1,66 @@
+from datetime import datetime
+from functools import lru_cache
+from dateutil import parser
+import pytz
+
+# ⚡ Formats tried with strptime when the ISO-8601 fast path doesn't match
+FAST_FORMATS = ("%Y/%m/%d %H:%M", "%Y/%m/%d %H:%M:%S")
+
+
+# 🌐 pytz.timezone is slow enough to matter per slot, so cache each zone
+@lru_cache(maxsize=None)
+def get_timezone(timezone_str):
+    return pytz.timezone(timezone_str)
+
+
+# ⏱️ Parse one timestamp string, trying the cheap parsers first
+def parse_timestamp(value):
+    value = value.strip()
+    # fromisoformat is C-implemented and also covers "YYYY-MM-DD HH:MM"
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in FAST_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    return parser.parse(value)
+
+
+# 🕒 Convert one timestamp to UTC, treating naive times as local to the timezone.
+# Uploads repeat the same boundaries (10:00, 10:30, ...) a lot, and pytz's
+# localize is the slowest step, so results are memoized per (value, timezone).
+@lru_cache(maxsize=65536)
+def to_utc(value, timezone_str):
+    dt = parse_timestamp(value)
+    if dt.tzinfo is None:
+        dt = get_timezone(timezone_str).localize(dt)
+    return dt.astimezone(pytz.utc)
+
+
+def parse_slots(slots, timezone_str='Asia/Kolkata'):
+    """
+    Convert a user's raw {start, end} slots into UTC datetimes in one pass.
+    Returns (parsed_slots, errors). Slots that fail are left out of
+    parsed_slots and recorded in errors as {"slot", "error"} dicts.
+    """
+    try:
+        get_timezone(timezone_str)
+    except Exception as e:
+        return [], [{"slot": None, "error": f"Unknown timezone {timezone_str!r}: {e}"}]
+
+    parsed = []
+    errors = []
+    for slot in slots:
+        if not slot:
+            continue
+        try:
+            parsed.append({
+                "start": to_utc(slot['start'], timezone_str),
+                "end": to_utc(slot['end'], timezone_str)
+            })
+        except Exception as e:
+            errors.append({"slot": slot, "error": str(e)})
+    return parsed, errors
@@ -0,0 +1,54 @@
+from collections import Counter
+from datetime import datetime
+import pytz
+
+from slot_parser import get_timezone
+
+# 🏢 Local working hours: core hours score fully, shoulder hours partly
+CORE_HOURS = (9, 17)
+SHOULDER_HOURS = (8, 19)
+
+# ⏰ Bonus for meetings starting on the hour / half hour / quarter hour
+ALIGNMENT_BONUS = {0: 0.2, 30: 0.15, 15: 0.05, 45: 0.05}
+
+
+# 🕒 How comfortable a UTC start time is for someone in `tz` (0 to 1)
+def working_hours_score(start_utc, tz):
+    local = start_utc.astimezone(tz)
+    if local.weekday() >= 5:
+        return 0.0
+    hour = local.hour + local.minute / 60
+    if CORE_HOURS[0] <= hour < CORE_HOURS[1]:
+        return 1.0
+    if SHOULDER_HOURS[0] <= hour < SHOULDER_HOURS[1]:
+        return 0.5
+    return 0.0
+
+
+def score_slot(slot, timezone_counts):
+    """
+    Score a {"start", "end"} UTC slot for a group of attendees, given as a
+    Counter of timezone name -> number of attendees. Higher is better.
+    """
+    start_utc = pytz.utc.localize(datetime.strptime(slot['start'], "%Y-%m-%d %H:%M"))
+    total = sum(timezone_counts.values())
+    comfort = 0.0
+    for timezone_str, count in timezone_counts.items():
+        try:
+            tz = get_timezone(timezone_str)
+        except Exception:
+            tz = pytz.utc
+        comfort += working_hours_score(start_utc, tz) * count
+    return comfort / total + ALIGNMENT_BONUS.get(start_utc.minute, 0.0)
+
+
+def rank_slots_locally(slots, timezones):
+    """
+    Order slots best-first using each attendee's timezone, working hours and
+    start-time alignment. Each distinct timezone is scored once per slot, so the
+    cost is O(slots x distinct timezones). Ties keep the earlier slot first.
+    """
+    timezone_counts = Counter(timezones or ['UTC'])
+    scored = [(-score_slot(slot, timezone_counts), i, slot) for i, slot in enumerate(slots)]
+    scored.sort(key=lambda entry: (entry[0], entry[1]))
+    return [slot for _, _, slot in scored]
@@ -0,0 +1,106 @@
+import codecs
+import json
+
+# 📦 Bytes read from the upload at a time
+CHUNK_SIZE = 64 * 1024
+
+# 🧾 Upload extensions treated as newline-delimited JSON (one user per line)
+NDJSON_EXTENSIONS = (".ndjson", ".jsonl")
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+class JSONObjectStream:
+    """
+    Reads a top-level JSON object from a binary stream one member at a time,
+    so only the member being decoded has to be held in memory.
+    """
+
+    def __init__(self, stream, chunk_size=CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size=None):
+        if self.eof:
+            return False
+        chunk = self.stream.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            self.buffer += self.text_decoder.decode(b"", final=True)
+            return False
+        self.buffer = self.buffer[self.pos:] + self.text_decoder.decode(chunk)
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON upload")
+
+    def _expect(self, char):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON upload but found {found!r}")
+        self.pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                # A value that runs to the end of the buffer may be cut short (e.g. a number)
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # raw_decode can't resume, so read at least as much again as is
+            # buffered: a big member is re-scanned O(log n) times, not once per chunk
+            self._fill(max(self.chunk_size, len(self.buffer) - self.pos))
+
+    def __iter__(self):
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            key = self._value()
+            if not isinstance(key, str):
+                raise ValueError("JSON upload keys must be strings")
+            self._expect(":")
+            yield key, self._value()
+            if self._peek() == ",":
+                self.pos += 1
+                continue
+            self._expect("}")
+            return
+
+
+# 📄 Yield (key, user_data) pairs from an NDJSON upload, one line per user
+def iter_ndjson(stream):
+    text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    for number, line in enumerate(stream, start=1):
+        line = text_decoder.decode(line).strip()
+        if line:
+            user_data = json.loads(line)
+            yield user_data.get("email") or f"user{number}", user_data
+
+
+def iter_calendar_users(stream, filename=""):
+    """
+    Yield (key, user_data) pairs from an uploaded calendar without loading the
+    whole file. `.ndjson`/`.jsonl` uploads hold one user object per line;
+    anything else is the usual {"user1": {...}, ...} JSON object.
+    """
+    if filename.lower().endswith(NDJSON_EXTENSIONS):
+        return iter_ndjson(stream)
+    return iter(JSONObjectStream(stream))
@@ -0,0 +1,60 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire `ttl_seconds` after they
+    were stored. Expiry times are wall-clock (time.time()) so subclasses can
+    persist them across restarts.
+    """
+
+    def __init__(self, max_size=256, ttl_seconds=3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    # 🔎 Return the value stored under `key`, or None when it's missing or expired
+    def lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    # 📥 Store `value` under `key`, evicting the least recently used entries past max_size
+    def store(self, key, value):
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._insert(key, expires_at, value)
+        return expires_at
+
+    def _insert(self, key, expires_at, value):
+        # Callers hold the lock
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
@@ -1,8 +1,14 @@
-import requests
 from datetime import datetime
+import logging
 import os
+import threading
+import time
 from dotenv import load_dotenv
 import base64
+from metrics import record_external_error
+from resilience import call_external, TransientError
+
+logger = logging.getLogger(__name__)
 
 # 📂 Load credentials (Client ID, Secret, etc.) from .env file
 load_dotenv()
@@ -12,26 +18,142 @@ CLIENT_SECRET = os.getenv("ZOOM_CLIENT_SECRET")
 ACCOUNT_ID = os.getenv("ZOOM_ACCOUNT_ID")
 ZOOM_USER_ID = os.getenv("ZOOM_USER_ID")
 
+# 🌐 Base URLs, overridable so tests can point at a local stub server
+ZOOM_OAUTH_URL = os.getenv("ZOOM_OAUTH_URL", "https://zoom.us/oauth/token")
+ZOOM_API_URL = os.getenv("ZOOM_API_URL", "https://api.zoom.us/v2")
+
+# ⏳ Refresh the token this many seconds before Zoom says it expires
+TOKEN_EXPIRY_MARGIN = 60
+
+# ⏱️ Connect/read timeouts per request, and the hard limit per Zoom call (retries included)
+ZOOM_CONNECT_TIMEOUT = 3.05
+ZOOM_READ_TIMEOUT = float(os.getenv("ZOOM_READ_TIMEOUT", "10"))
+ZOOM_DEADLINE = float(os.getenv("ZOOM_TIMEOUT", "15"))
+
+# 🔁 Statuses retried with jittered backoff. Creating a meeting isn't
+# idempotent: a 5xx or read timeout may come after Zoom made the meeting, so
+# that POST is only retried when Zoom surely didn't see it (429, no connection)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+UNSENT_RETRY_STATUSES = {429}
+ZOOM_RETRIES = 3
+
+# 🔌 One keep-alive session for every Zoom call (retries happen in resilience.call_external)
+def build_session():
+    import requests
+    return requests.Session()
+
+# 💤 Built on first use so importing this module doesn't load requests
+session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    global session
+    if session is None:
+        with _session_lock:
+            if session is None:
+                session = build_session()
+    return session
+
+# 🔌 True when the request never reached Zoom (refused, DNS failure or connect timeout)
+def is_connect_error(error):
+    import requests
+    from urllib3.exceptions import NewConnectionError
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(error, requests.ConnectionError) and isinstance(reason, NewConnectionError)
+
+# 📨 POST to Zoom, turning `retry_statuses` and failed connects into retryable failures
+def post_to_zoom(url, retry_statuses=RETRY_STATUSES, **kwargs):
+    try:
+        response = get_session().post(url, timeout=(ZOOM_CONNECT_TIMEOUT, ZOOM_READ_TIMEOUT), **kwargs)
+    except OSError as e:
+        if is_connect_error(e):
+            raise TransientError(f"Could not connect to Zoom: {e}") from e
+        raise
+    if response.status_code in retry_statuses:
+        retry_after = response.headers.get("Retry-After", "")
+        raise TransientError(
+            f"Zoom returned HTTP {response.status_code}",
+            retry_after=float(retry_after) if retry_after.isdigit() else None
+        )
+    return response
+
+def call_zoom(operation, url, idempotent=True, **kwargs):
+    """
+    POST through resilience.call_external. Idempotent calls (the token fetch)
+    retry timeouts and 5xx too; others only retry what Zoom never processed.
+    """
+    if idempotent:
+        return call_external(
+            "zoom", operation, post_to_zoom, url,
+            deadline=ZOOM_DEADLINE, retries=ZOOM_RETRIES, **kwargs
+        )
+    return call_external(
+        "zoom", operation, post_to_zoom, url, retry_statuses=UNSENT_RETRY_STATUSES,
+        deadline=ZOOM_DEADLINE, retries=ZOOM_RETRIES, retry_on=(TransientError,), **kwargs
+    )
+
 # 🔐 Generate Basic Auth Token by combining client_id and client_secret
 def get_basic_auth_token():
     token = f"{CLIENT_ID}:{CLIENT_SECRET}"
     return base64.b64encode(token.encode()).decode()
 
+class TokenManager:
+    """
+    Caches the account-credentials access token until shortly before it
+    expires. Concurrent callers share a single refresh.
+    """
+
+    def __init__(self):
+        self.access_token = None
+        self.expires_at = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.access_token and time.monotonic() < self.expires_at:
+            return self.access_token
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if self.access_token and time.monotonic() < self.expires_at:
+                return self.access_token
+            self._refresh()
+            return self.access_token
+
+    def invalidate(self):
+        with self._lock:
+            self.access_token = None
+            self.expires_at = 0
+
+    def _refresh(self):
+        url = f"{ZOOM_OAUTH_URL}?grant_type=account_credentials&account_id={ACCOUNT_ID}"
+        headers = {
+            "Authorization": f"Basic {get_basic_auth_token()}",
+        }
+        try:
+            response = call_zoom("token", url, headers=headers)
+        except Exception as e:
+            logger.warning("⚠️ Access token error: %s", e)
+            self.access_token = None
+            return
+
+        if response.status_code == 200:
+            # ✅ Cache access_token until just before it expires
+            data = response.json()
+            self.access_token = data.get("access_token")
+            expires_in = int(data.get("expires_in", 3600))
+            self.expires_at = time.monotonic() + max(0, expires_in - TOKEN_EXPIRY_MARGIN)
+        else:
+            # ⚠️ Log error if token fetching fails
+            record_external_error("zoom", "token", f"http_{response.status_code}")
+            logger.warning("⚠️ Access token error", extra={"status": response.status_code, "body": response.text})
+            self.access_token = None
+
+token_manager = TokenManager()
+
 # 🔑 Get Zoom OAuth access token using account credentials
 def get_access_token():
-    url = f"https://zoom.us/oauth/token?grant_type=account_credentials&account_id={ACCOUNT_ID}"
-    headers = {
-        "Authorization": f"Basic {get_basic_auth_token()}",
-    }
-    response = requests.post(url, headers=headers)
-    
-    if response.status_code == 200:
-        # ✅ Return access_token if request is successful
-        return response.json().get("access_token")
-    else:
-        # ⚠️ Print error if token fetching fails
-        print("⚠️ Access token error:", response.status_code, response.text)
-        return None
+    return token_manager.get()
 
 # 📅 Create a Zoom meeting using the access token
 def create_zoom_meeting(start_time, topic="AI Scheduled Meeting", duration=30):
@@ -60,14 +182,24 @@ def create_zoom_meeting(start_time, topic="AI Scheduled Meeting", duration=30):
     }
 
     # 🌐 API endpoint to create meeting under specific Zoom user
-    url = f"https://api.zoom.us/v2/users/{ZOOM_USER_ID}/meetings"
-    response = requests.post(url, headers=headers, json=payload)
+    url = f"{ZOOM_API_URL}/users/{ZOOM_USER_ID}/meetings"
+    try:
+        response = call_zoom("create_meeting", url, idempotent=False, headers=headers, json=payload)
+    except Exception as e:
+        # ⚡ Timeouts, exhausted retries and an open circuit all land here
+        logger.error("❌ Zoom meeting creation failed: %s", e)
+        return "https://zoom.us/"
+
+    if response.status_code == 401:
+        # 🔐 Token was revoked early; drop it so the next meeting fetches a new one
+        token_manager.invalidate()
 
     if response.status_code == 201:
-        print("✅ Zoom meeting created successfully!")
+        logger.info("✅ Zoom meeting created successfully!")
         return response.json()["join_url"]  # Return Zoom meeting link
     else:
-        print("❌ Zoom meeting creation failed:", response.status_code, response.text)
+        record_external_error("zoom", "create_meeting", f"http_{response.status_code}")
+        logger.error("❌ Zoom meeting creation failed", extra={"status": response.status_code, "body": response.text})
         return "https://zoom.us/"  # Fallback Zoom homepage URL
 
 # 🧪 Optional: Run this script directly to test meeting creation
@@ -0,0 +1,57 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+# 📍 Make the scheduler modules in main/ (and the benchmark stubs) importable, with side-effect-free settings
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "main"))
+os.environ.setdefault("JOB_STORE", "memory")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("EMAIL_RATE", "0")
+
+import ai_utils
+import app
+from availability_index import AvailabilityIndex
+from benchmarks.stubs import stub_backends
+
+
+class FailingGemini:
+    def generate_content(self, prompt, **kwargs):
+        raise ValueError("Gemini is down")
+
+
+@pytest.fixture
+def gemini_down():
+    ai_utils.draft_cache.clear()
+    with stub_backends() as backends:
+        ai_utils.model = FailingGemini()
+        yield backends
+
+
+def make_agents():
+    return [app.UserAgent("Asha", "asha@example.com", "UTC"), app.UserAgent("Ravi", "ravi@example.com", "UTC")]
+
+
+def test_confirmation_uses_templates_when_gemini_fails(gemini_down):
+    slot = {"start": "2025-06-30 10:00", "end": "2025-06-30 10:30"}
+
+    result = app.schedule_meeting(make_agents(), None, slot, "Bench", "https://zoom.example/j/1", None)
+
+    assert "Meeting Scheduled Successfully" in result
+    assert gemini_down["gmail"].sent == 2
+
+
+def test_reschedule_uses_templates_when_gemini_fails(gemini_down):
+    start = pytz.utc.localize(datetime(2025, 6, 30, 9))
+    availability = AvailabilityIndex(min_length=timedelta(minutes=30), window=(start, start + timedelta(days=1)))
+    availability.add_user("asha", [{"start": start, "end": start + timedelta(hours=1)}])
+    availability.add_user("ravi", [{"start": start + timedelta(hours=2), "end": start + timedelta(hours=3)}])
+
+    result = app.schedule_meeting(make_agents(), availability, None, "Bench", None, None)
+
+    assert "No common slots found" in result
+    assert gemini_down["gmail"].sent == 2
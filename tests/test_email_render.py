@@ -0,0 +1,39 @@
+import os
+import sys
+import time
+
+import pytest
+
+# 📍 Make the scheduler modules in main/ importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main"))
+
+from email_render import MeetingRender
+
+
+@pytest.fixture
+def new_york_server():
+    # Run as if the server's local time were US Eastern, not UTC
+    previous = os.environ.get("TZ")
+    os.environ["TZ"] = "America/New_York"
+    time.tzset()
+    yield
+    if previous is None:
+        del os.environ["TZ"]
+    else:
+        os.environ["TZ"] = previous
+    time.tzset()
+
+
+def test_slot_times_are_utc_regardless_of_server_timezone(new_york_server):
+    render = MeetingRender({"start": "2025-06-30 14:00", "end": "2025-06-30 14:30"})
+
+    assert render.utc == {"start": "02:00 PM", "end": "02:30 PM"}
+    assert render.times("Asia/Kolkata") == {"start": "07:30 PM", "end": "08:00 PM", "date": "2025-06-30"}
+    assert render.times("America/New_York") == {"start": "10:00 AM", "end": "10:30 AM", "date": "2025-06-30"}
+
+
+def test_early_utc_slot_falls_on_the_previous_local_day(new_york_server):
+    render = MeetingRender({"start": "2025-07-01 02:00", "end": "2025-07-01 03:00"})
+
+    assert render.date == "2025-07-01"
+    assert render.times("America/New_York") == {"start": "10:00 PM", "end": "11:00 PM", "date": "2025-06-30"}
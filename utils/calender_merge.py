@@ -1,38 +1,35 @@
 import json
+import os
+import sys
 from datetime import datetime
 
+# 📍 Make the shared slot engine in main/ importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main"))
+from slot_engine import intersect_slots
+
 # ⏳ Helper function to convert "HH:MM" string to datetime object
 def parse_time(slot):
     return datetime.strptime(slot, "%H:%M")
 
 # 🔄 Finds overlapping time ranges between two users' slots
 def find_overlap(slots1, slots2):
-    overlap = []
-    for a in slots1:
-        for b in slots2:
-            # Get latest start time and earliest end time
-            start = max(parse_time(a["start"]), parse_time(b["start"]))
-            end = min(parse_time(a["end"]), parse_time(b["end"]))
-
-            # Only if valid overlap (i.e., time duration > 0)
-            if start < end:
-                overlap.append({
-                    "start": start.strftime("%H:%M"),
-                    "end": end.strftime("%H:%M")
-                })
-    return overlap
+    return merge_calendars([slots1, slots2])
+
+# 🧮 Intersect any number of "HH:MM" slot lists with the shared sweep engine
+def merge_calendars(slot_lists):
+    parsed = [
+        [{"start": parse_time(s["start"]), "end": parse_time(s["end"])} for s in slots if s]
+        for slots in slot_lists
+    ]
+    common = intersect_slots(parsed)
+    return [{
+        "start": s["start"].strftime("%H:%M"),
+        "end": s["end"].strftime("%H:%M")
+    } for s in common]
 
 # 🔍 Loop through all users and find the common overlapping slots
 def find_common_slots(calendars):
-    users = list(calendars.keys())  # Extract all usernames from JSON
-    common_slots = calendars[users[0]]  # Start with the first user's slots
-
-    # Compare with each subsequent user's calendar
-    for user in users[1:]:
-        common_slots = find_overlap(common_slots, calendars[user])
-        if not common_slots:
-            break  # If no overlap remains, exit early
-    return common_slots
+    return merge_calendars(list(calendars.values()))
 
 # 🚀 Run this part only if the script is executed directly
 if __name__ == "__main__":